@@ -0,0 +1,97 @@
+"""
+Account deletion.
+
+A user is purged in bounded batches: every batch deletes at most
+ERASURE_BATCH rows of one table and is committed on its own by the caller
+(erasure.py), so no transaction holds locks for long, whatever the amount of
+content the user or the couple created. Every step deletes whatever is
+left, so an interrupted purge can simply be started again.
+
+The content tables also cascade in the database (ON DELETE CASCADE), but
+every dependent row is deleted explicitly so the result is the same where
+foreign keys are not enforced (SQLite). The couples' counters (counters.py)
+are updated in the same batches.
+"""
+from sqlalchemy import select, delete, exists, or_
+from models import db, User, Couple, Mission, Challenges, Scenario, CoupleMission, CoupleChallenges, CoupleScenario, StoryProgress
+from sync import ACCEPTANCE_KINDS, record_tombstones
+from counters import adjust_counters, uncount_acceptances
+
+ERASURE_BATCH = 500  # rows deleted per transaction
+# acceptance model -> kind, for the accepted counters of the couples
+ACCEPTANCE_MODELS = {link_model: kind for kind, (_, link_model, _) in ACCEPTANCE_KINDS.items()}
+# custom content model -> its counter on the couple
+CUSTOM_COUNTERS = {Mission: 'custom_missions_count', Challenges: 'custom_challenges_count'}
+
+
+def _delete_batch(model, *criteria):
+    """Delete up to ERASURE_BATCH rows of model matching criteria, returns their ids"""
+    ids = db.session.scalars(select(model.id).where(*criteria).order_by(model.id).limit(ERASURE_BATCH)).all()
+    if ids:
+        if model in ACCEPTANCE_MODELS:
+            # Acceptances of the couple's content may belong to other couples
+            uncount_acceptances(ACCEPTANCE_MODELS[model], model.id.in_(ids))
+        db.session.execute(delete(model).where(model.id.in_(ids)))
+    return ids
+
+
+def _delete_scenarios_batch(user_id, couple_id):
+    ids = db.session.scalars(
+        select(Scenario.id).where(Scenario.created_by == user_id).order_by(Scenario.id).limit(ERASURE_BATCH)
+    ).all()
+    if ids:
+        # The partner still lists the scenarios until the next sync
+        record_tombstones('scenarios', ids, couple_id)
+        uncount_acceptances('scenarios', CoupleScenario.scenario_id.in_(ids))
+        db.session.execute(delete(CoupleScenario).where(CoupleScenario.scenario_id.in_(ids)))
+        db.session.execute(delete(Scenario).where(Scenario.id.in_(ids)))
+    return ids
+
+
+def _others_stay(user_id, couple_id):
+    # Members who are not being deleted themselves keep the couple and its content
+    return db.session.scalar(select(exists().where(
+        User.couple_id == couple_id, User.id != user_id, User.deletion_requested_at.is_(None)
+    )))
+
+
+def purge_account(user_id, couple_id):
+    """
+    Delete a user and the scenarios they created and, when no other member
+    stays, the couple with all its content. Runs in the current session and
+    yields (step, deleted rows) after every batch: the caller commits there.
+    """
+    while True:
+        ids = _delete_scenarios_batch(user_id, couple_id)
+        if not ids:
+            break
+        yield 'scenarios', len(ids)
+
+    couple_missions = select(Mission.id).where(Mission.created_by == couple_id)
+    couple_challenges = select(Challenges.id).where(Challenges.created_by == couple_id)
+    steps = [
+        ('accepted_missions', CoupleMission,
+         or_(CoupleMission.couple_id == couple_id, CoupleMission.mission_id.in_(couple_missions))),
+        ('accepted_challenges', CoupleChallenges,
+         or_(CoupleChallenges.couple_id == couple_id, CoupleChallenges.challenges_id.in_(couple_challenges))),
+        ('accepted_scenarios', CoupleScenario, CoupleScenario.couple_id == couple_id),
+        ('story_progress', StoryProgress, StoryProgress.couple_id == couple_id),
+        ('missions', Mission, Mission.created_by == couple_id),
+        ('challenges', Challenges, Challenges.created_by == couple_id),
+    ]
+    for step, model, criterion in steps:
+        # Checked before every batch, the purge spans many transactions
+        while not _others_stay(user_id, couple_id):
+            ids = _delete_batch(model, criterion)
+            if not ids:
+                break
+            if model in CUSTOM_COUNTERS:
+                adjust_counters(couple_id, **{CUSTOM_COUNTERS[model]: -len(ids)})
+            yield step, len(ids)
+
+    deleted = db.session.execute(delete(User).where(User.id == user_id)).rowcount
+    # The last member to go takes the couple along (a partner being deleted too may still be there)
+    deleted += db.session.execute(delete(Couple).where(
+        Couple.id == couple_id, ~exists().where(User.couple_id == couple_id)
+    )).rowcount
+    yield 'account', deleted
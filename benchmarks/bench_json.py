@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: encoding a catalog listing response.
+
+Cases, for a listing of N entries shaped like the missions catalog:
+- Flask's default provider (stdlib json, the old jsonify path)
+- json_provider.FastJSONProvider (orjson when installed)
+- catalog_cache.encode_catalog (precreated entries encoded once, only the
+  per-couple 'accepted' flag is added per request)
+
+    python benchmarks/bench_json.py [iterations] [entries]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import catalog_cache
+from catalog_cache import encode_catalog, overlay_accepted
+from json_provider import FastJSONProvider, dumps_bytes, orjson
+
+
+def build_entries(count):
+    return tuple(
+        {
+            'id': i,
+            'content': f"Mission number {i}: plan a surprise evening with music, candles and a handwritten note",
+            'category': ('Romance', 'Adventure', 'Light')[i % 3],
+            'is_precreated': True,
+            'created_by': None,
+        }
+        for i in range(1, count + 1)
+    )
+
+
+def per_call(fn, iterations):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    entries = build_entries(count)
+    accepted_ids = set(range(1, count + 1, 7))
+    catalog_cache._encoded['missions'] = {entry['id']: dumps_bytes(entry)[1:] for entry in entries}
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    results = {}
+    with app.app_context():
+        results['Flask default provider'] = per_call(
+            lambda: default_provider.response(overlay_accepted(entries, accepted_ids)), iterations)
+        results['FastJSONProvider'] = per_call(
+            lambda: fast_provider.response(overlay_accepted(entries, accepted_ids)), iterations)
+        results['encode_catalog (pre-encoded)'] = per_call(
+            lambda: app.response_class(encode_catalog('missions', entries, accepted_ids) + b'\n',
+                                       mimetype='application/json'), iterations)
+
+    print(f"{iterations} responses of {count} entries per case, {'orjson' if orjson else 'stdlib json (orjson not installed)'}")
+    for name, micros in results.items():
+        print(f"  {name:<30} {micros:8.1f} µs/response")
+
+
+if __name__ == '__main__':
+    main()
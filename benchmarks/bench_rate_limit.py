@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: per-request cost of route rate limiting.
+
+Cases:
+- the old decorator (looked up the limiter and re-wrapped the view with
+  Flask-Limiter's limiter.limit() on every request)
+- Flask-Limiter's limiter.limit() applied once at import
+- rate_limits.RateLimiter (one Lua script call for all the limits of a route)
+- the bare storage hit, as a floor
+
+Without a Redis URL everything uses in-memory storage, which measures only
+the Python overhead. With one, the network round trips are included; the
+route has two limits, which Flask-Limiter checks with one call each.
+
+    python benchmarks/bench_rate_limit.py [iterations] [redis_url]
+"""
+import os
+import sys
+import time
+from functools import wraps
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask, current_app
+from flask_limiter import Limiter
+from limits import parse_many
+from rate_limits import RateLimiter, get_user_id
+
+LIMIT = "1000000 per minute;10000000 per day"  # never exceeded
+
+
+def legacy_rate_limit(limit_string):
+    """The original implementation, kept here for comparison"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            limiter = next(iter(current_app.extensions['limiter']))
+            limited_function = limiter.limit(limit_string)(f)
+            return limited_function(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def build_app(redis_url):
+    app = Flask(__name__)
+    app.config['RATELIMIT_STORAGE_URI'] = redis_url or 'memory://'
+    app.config['RATELIMIT_STORAGE_URL'] = redis_url
+    flask_limiter = Limiter(key_func=get_user_id, default_limits=["3000 per hour"])
+    flask_limiter.init_app(app)
+    rate_limiter = RateLimiter(key_func=get_user_id, default_limits=["3000 per hour"])
+    rate_limiter.init_app(app)
+    # Compare the storage paths, not the flood pre-filter
+    rate_limiter.prefilter = False
+
+    @app.route('/legacy')
+    @legacy_rate_limit(LIMIT)
+    def legacy_view():
+        return 'ok'
+
+    @app.route('/registered')
+    @flask_limiter.limit(LIMIT)
+    def registered_view():
+        return 'ok'
+
+    @app.route('/current')
+    @rate_limiter.limit(LIMIT)
+    def current_view():
+        return 'ok'
+
+    return app, flask_limiter, rate_limiter
+
+
+def per_call(fn, iterations):
+    fn()  # warm up (first call registers lazily on the legacy path)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    redis_url = sys.argv[2] if len(sys.argv) > 2 else None
+    app, flask_limiter, rate_limiter = build_app(redis_url)
+    items = parse_many(LIMIT)
+
+    def storage_hits():
+        for item in items:
+            flask_limiter.limiter.hit(item, 'ip:bench', 'current_view')
+
+    results = {}
+    with app.test_request_context('/legacy'):
+        results['legacy (wrap per request)'] = per_call(app.view_functions['legacy_view'], iterations)
+    with app.test_request_context('/registered'):
+        results['limiter.limit() at import'] = per_call(app.view_functions['registered_view'], iterations)
+    with app.test_request_context('/current'):
+        results['RateLimiter (one script call)'] = per_call(app.view_functions['current_view'], iterations)
+        results['storage hits only'] = per_call(storage_hits, iterations)
+
+    print(f"{iterations} calls per case, {'Redis at ' + redis_url if redis_url else 'in-memory storage'}")
+    for name, micros in results.items():
+        print(f"  {name:<30} {micros:8.1f} µs/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark: validate_text_input on realistic mission/comment text.
+
+Compares the previous implementation (eight re.search calls plus a
+re.findall per call) with validation.validate_text_input, after checking
+that both give the same result on every sample.
+
+    python benchmarks/bench_validation.py [rounds]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from validation import validate_text_input
+from seed_missions import precreated_missions
+from seed_challenges import precreated_challenges
+
+
+def legacy_validate_text_input(text, field_name, max_length=500, min_length=1):
+    """The previous implementation, kept here for comparison"""
+    if text is None or not isinstance(text, str):
+        return None, f"{field_name} is required and must be text"
+    text = text.strip()
+    if len(text) < min_length:
+        return None, f"{field_name} is too short"
+    if len(text) > max_length:
+        return None, f"{field_name} is too long (max {max_length} characters)"
+    dangerous_patterns = [
+        r'<script[^>]*>.*?</script>',
+        r'javascript:',
+        r'on\w+\s*=',
+        r'<iframe[^>]*>',
+        r'<object[^>]*>',
+        r'<embed[^>]*>',
+        r'eval\s*\(',
+        r'Function\s*\(',
+    ]
+    for pattern in dangerous_patterns:
+        if re.search(pattern, text, re.IGNORECASE):
+            return None, f"{field_name} contains potentially unsafe content"
+    special_char_count = len(re.findall(r'[<>{}[\]\\`]', text))
+    if special_char_count > len(text) * 0.1:
+        return None, f"{field_name} contains too many special characters"
+    return text, None
+
+
+COMMENTS = [
+    "We loved it! Took us two tries to get the choreography right :)",
+    "Too cold outside (next time we bring blankets), but the stars were amazing.",
+    "Cooked together = best evening of the month",
+    "ok",
+    "Ten out of ten, would do again",
+]
+UNSAFE = [
+    "nice <script>alert(1)</script>",
+    "click javascript:void(0)",
+    "<img src=x onerror = alert(1)>",
+    "eval (document.cookie)",
+    "{[<>]}`\\ {[<>]}",
+    "<SCRIPT src=x>go</SCRIPT>",
+    "JaVaScRiPt:alert(1)",
+    "<a ONCLICK = 'x'>",
+    "Très joli — new Function ('return 1')",
+    "Café <IFrame src='x'>",
+]
+SAMPLES = [item['content'] for item in precreated_missions + precreated_challenges] + COMMENTS + UNSAFE
+
+
+def per_call(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in SAMPLES:
+            fn(text, "Content", max_length=300, min_length=1)
+    return (time.perf_counter() - started) / (rounds * len(SAMPLES)) * 1e6
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for text in SAMPLES:
+        assert validate_text_input(text, "Content", 300) == legacy_validate_text_input(text, "Content", 300), text
+
+    legacy = per_call(legacy_validate_text_input, rounds)
+    current = per_call(validate_text_input, rounds)
+    print(f"{len(SAMPLES)} samples x {rounds} rounds")
+    print(f"  legacy (8 searches + findall) {legacy:6.2f} µs/call")
+    print(f"  compiled single pass          {current:6.2f} µs/call  ({legacy / current:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Load test of the hot read endpoints under each gunicorn worker class.
+
+`run` drives an already running server. `compare` starts gunicorn once per
+worker class (sync is the Procfile setup, then gthread and gevent; see
+gunicorn.conf.py), runs the same load against each and prints a table.
+
+Requests carry a user's access token, e.g. minted with `flask shell`:
+    >>> from tokens import create_user_access_token
+    >>> create_user_access_token(user.id, user.couple_id)
+
+Rate limiting must be off on the tested server (RATELIMIT_ENABLED=false,
+set automatically by `compare`), otherwise most requests answer 429.
+
+    python benchmarks/load_test.py run --url http://127.0.0.1:5000 --token TOKEN
+    python benchmarks/load_test.py compare --token TOKEN --workers 2 --concurrency 50
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import requests
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+DEFAULT_PATHS = ['/api/missions', '/api/challenges', '/api/scenarios', '/api/story/status']
+
+
+def run_load(url, token, paths, concurrency, duration):
+    """Hit the paths round-robin from concurrency threads for duration seconds"""
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        session = requests.Session()
+        session.headers['Authorization'] = f"Bearer {token}"
+        local, codes, i = [], {}, offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                status = session.get(url + paths[i % len(paths)], timeout=30).status_code
+            except requests.RequestException:
+                status = 'error'
+            local.append(time.perf_counter() - started)
+            codes[status] = codes.get(status, 0) + 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+            for status, count in codes.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'failed': sum(count for status, count in statuses.items() if status != 200),
+        'statuses': statuses,
+    }
+
+
+def wait_healthy(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url + '/health', timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def print_result(name, result):
+    print(f"  {name:<10} {result['rps']:8.1f} req/s   p50 {result['p50']:7.1f} ms   "
+          f"p95 {result['p95']:7.1f} ms   p99 {result['p99']:7.1f} ms   "
+          f"{result['requests']} requests, {result['failed']} failed {result['statuses']}")
+
+
+def compare(args):
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"{args.workers} workers, {args.concurrency} clients, {args.duration}s per worker class, {', '.join(args.paths)}")
+    for worker_class in args.worker_classes:
+        env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, RATELIMIT_ENABLED='false',
+                   WEB_CONCURRENCY=str(args.workers), PORT=str(args.port))
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_healthy(url):
+                print(f"  {worker_class:<10} server did not become healthy")
+                continue
+            run_load(url, args.token, args.paths, args.concurrency, 2)  # warm up the caches
+            print_result(worker_class, run_load(url, args.token, args.paths, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['run', 'compare'])
+    parser.add_argument('--token', default=os.getenv('LOAD_TEST_TOKEN'), required='LOAD_TEST_TOKEN' not in os.environ)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server to load (run)')
+    parser.add_argument('--port', type=int, default=5077, help='port of the started servers (compare)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (compare)')
+    parser.add_argument('--worker-classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    args = parser.parse_args()
+
+    if args.mode == 'run':
+        print_result('server', run_load(args.url.rstrip('/'), args.token, args.paths, args.concurrency, args.duration))
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Database bootstrap: table creation and seeding of the precreated content.
+
+This runs once per release (`flask bootstrap`, see the Procfile) instead of in
+every gunicorn worker. Concurrent runs are serialized with a Postgres advisory
+lock, and seeding is incremental (see seeding.py): a boot with unchanged seed
+files does not touch the content tables.
+"""
+from contextlib import contextmanager
+from sqlalchemy import text
+from models import db
+from seeding import SEED_FILES, seed_kind
+
+BOOTSTRAP_LOCK_KEY = 72150401  # arbitrary, shared by every process running the bootstrap
+
+
+@contextmanager
+def bootstrap_lock():
+    """Postgres advisory lock so only one process bootstraps at a time (no-op on other databases)"""
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+
+    with db.engine.connect() as conn:
+        # Waiting for another bootstrap must not hit the profile's statement_timeout
+        conn.execute(text('SET LOCAL statement_timeout = 0'))
+        conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': BOOTSTRAP_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': BOOTSTRAP_LOCK_KEY})
+
+
+def check_database(app):
+    """Worker startup check: the database answers. Returns True when it does."""
+    with app.app_context():
+        try:
+            db.session.execute(text('SELECT 1'))
+            app.logger.info("✅ Database connection successful")
+            return True
+        except Exception as e:
+            app.logger.error(f"❌ Database connection failed: {e}")
+            return False
+        finally:
+            db.session.remove()
+
+
+def auto_initialize_database(app, force=False):
+    """
+    Initialize and seed the database (the `flask bootstrap` release step).
+    Seed files that did not change since the last successful run are skipped,
+    unless force is set. Returns True on success.
+    """
+    with app.app_context():
+        try:
+            # Check if database is accessible
+            db.session.execute(text('SELECT 1'))
+            app.logger.info("✅ Database connection successful")
+
+            with bootstrap_lock():
+                # Create all tables if they don't exist
+                db.create_all()
+                app.logger.info("✅ Database tables created/verified")
+
+                return auto_seed_all_data(app, force=force)
+
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"❌ Database initialization failed: {e}")
+            # Don't crash the app, just log the error
+            return False
+
+
+def auto_seed_all_data(app, force=False):
+    """Bring the precreated content in line with the seed files. Returns False when seeding failed."""
+    try:
+        for kind in SEED_FILES:
+            result = seed_kind(kind, force=force)
+            if result is None:
+                app.logger.info(f"ℹ️  {kind} seed file unchanged, skipping")
+            else:
+                added, updated = result
+                app.logger.info(f"✅ Seeded {kind}: {added} added, {updated} updated")
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"❌ Auto-seeding failed: {e}")
+        return False
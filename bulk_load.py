@@ -0,0 +1,205 @@
+"""
+Bulk loader for large content packs (`flask load-content`).
+
+Seed items are streamed from JSON Lines or CSV files, or taken from the
+built-in seed lists, and merged into the precreated content with the same
+item hashes as seeding.py, so packs and seed files never duplicate each other.
+
+On Postgres the items are COPY'd into a temporary staging table in chunks and
+merged with a handful of set-based statements. On other databases (SQLite)
+they go through seeding.merge_items() in chunks.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import JSON, text
+from models import db, SeedItem
+from seeding import SEED_FILES, seed_item, merge_items
+
+CHUNK_SIZE = 1000  # items per COPY / per statement on the fallback path (SQLite caps bound parameters)
+
+
+def _columns(kind):
+    """(fields, required fields, JSON fields, field -> max length) of a kind, from its model columns"""
+    model, _, _, fields = SEED_FILES[kind]
+    columns = model.__table__.c
+    required = {field for field in fields if not columns[field].nullable}
+    json_fields = {field for field in fields if isinstance(columns[field].type, JSON)}
+    lengths = {field: columns[field].type.length for field in fields if getattr(columns[field].type, 'length', None)}
+    return fields, required, json_fields, lengths
+
+
+def _check_item(item, line, fields, required, lengths):
+    if not isinstance(item, dict):
+        raise ValueError(f"Line {line}: expected an object")
+    unknown = sorted(str(column) for column in item if column not in fields)
+    if unknown:
+        raise ValueError(f"Line {line}: unknown fields {', '.join(unknown)}")
+    missing = [field for field in fields if field in required and item.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Line {line}: missing {', '.join(missing)}")
+    # SQLite does not enforce the lengths, Postgres would reject the whole pack
+    for field, length in lengths.items():
+        if isinstance(item.get(field), str) and len(item[field]) > length:
+            raise ValueError(f"Line {line}: {field} is longer than {length} characters")
+    return item
+
+
+def read_items(kind, path, fmt=None):
+    """
+    Stream the seed items of a kind from a JSON Lines or CSV file (format guessed
+    from the extension). Raises ValueError, with the line number, on the first bad item.
+    """
+    fmt = fmt or ('csv' if path.endswith('.csv') else 'jsonl')
+    fields, required, json_fields, lengths = _columns(kind)
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                if None in row:
+                    raise ValueError(f"Line {reader.line_num}: more cells than columns")
+                item = {}
+                for column, value in row.items():
+                    # Empty (or missing) cells are null, list columns (scenario roles) are JSON-encoded
+                    value = value or None
+                    if value is not None and column in json_fields:
+                        try:
+                            value = json.loads(value)
+                        except ValueError:
+                            raise ValueError(f"Line {reader.line_num}: {column} is not valid JSON")
+                    item[column] = value
+                yield _check_item(item, reader.line_num, fields, required, lengths)
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"Line {line_number}: invalid JSON")
+                yield _check_item(item, line_number, fields, required, lengths)
+
+
+def _chunks(kind, items):
+    """Validated (item key, values, item hash) tuples, CHUNK_SIZE at a time"""
+    key_field = SEED_FILES[kind][2]
+    iterator = iter(items)
+    position = 0
+    while True:
+        chunk = []
+        for item in islice(iterator, CHUNK_SIZE):
+            position += 1
+            if not isinstance(item, dict) or not item.get(key_field):
+                raise ValueError(f"Item {position} has no {key_field}")
+            chunk.append(seed_item(kind, item))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_items(kind, items):
+    """
+    Merge seed items into the precreated content of a kind, in the current
+    transaction. Returns (total, added, updated).
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return _load_with_copy(kind, items)
+
+    total = added = updated = 0
+    for chunk in _chunks(kind, items):
+        chunk_added, chunk_updated = merge_items(kind, [values for _, values, _ in chunk])
+        total += len(chunk)
+        added += chunk_added
+        updated += chunk_updated
+    return total, added, updated
+
+
+def _copy_value(value):
+    # COPY text format: \N is null, backslash escapes for the separators
+    if value is None:
+        return '\\N'
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _load_with_copy(kind, items):
+    model, _, key_field, fields = SEED_FILES[kind]
+    table = model.__tablename__
+    manifest = SeedItem.__tablename__
+    columns = ', '.join(fields)
+    staged = ', '.join(f's.{field}' for field in fields)
+    session = db.session
+    # One process-local clock for every row, the one sync cursors are compared with
+    params = {'kind': kind, 'now': datetime.now()}
+
+    # Same column types as the content table, dropped with the transaction
+    session.execute(text(
+        f"CREATE TEMP TABLE seed_staging ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+    ))
+    session.execute(text(
+        "ALTER TABLE seed_staging ADD COLUMN ord integer, "
+        "ADD COLUMN item_key varchar(64), ADD COLUMN item_hash varchar(64)"
+    ))
+
+    cursor = session.connection().connection.cursor()
+    total = 0
+    for chunk in _chunks(kind, items):
+        lines = []
+        for key, values, item_hash in chunk:
+            total += 1
+            row = [str(total), key, item_hash] + [_copy_value(values[field]) for field in fields]
+            lines.append('\t'.join(row) + '\n')
+        try:
+            cursor.copy_expert(
+                f"COPY seed_staging (ord, item_key, item_hash, {columns}) FROM STDIN",
+                io.StringIO(''.join(lines))
+            )
+        except db.engine.dialect.dbapi.Error as e:
+            # The raw cursor bypasses SQLAlchemy, report it like the other bad packs
+            raise ValueError(f"COPY of items {total - len(chunk) + 1}-{total} failed: {str(e).splitlines()[0]}") from e
+
+    # The last occurrence of a duplicated item wins, as with the seed lists
+    session.execute(text(
+        "DELETE FROM seed_staging s USING seed_staging t WHERE s.item_key = t.item_key AND s.ord < t.ord"
+    ))
+
+    # Adopt precreated rows loaded before the manifest existed (empty hash: rewritten below)
+    session.execute(text(f"""
+        INSERT INTO {manifest} (kind, item_key, item_hash, entity_id)
+        SELECT DISTINCT ON (s.item_key) :kind, s.item_key, '', t.id
+        FROM seed_staging s JOIN {table} t ON t.is_precreated AND t.{key_field} = s.{key_field}
+        WHERE NOT EXISTS (SELECT 1 FROM {manifest} i WHERE i.kind = :kind AND i.item_key = s.item_key)
+        ORDER BY s.item_key, t.id
+        ON CONFLICT (kind, item_key) DO NOTHING
+    """), params)
+
+    updated = session.execute(text(f"""
+        UPDATE {table} t SET {', '.join(f'{field} = s.{field}' for field in fields)}, updated_at = :now
+        FROM seed_staging s JOIN {manifest} i ON i.kind = :kind AND i.item_key = s.item_key
+        WHERE t.id = i.entity_id AND i.item_hash <> s.item_hash
+    """), params).rowcount
+    session.execute(text(f"""
+        UPDATE {manifest} i SET item_hash = s.item_hash
+        FROM seed_staging s
+        WHERE i.kind = :kind AND i.item_key = s.item_key AND i.item_hash <> s.item_hash
+    """), params)
+
+    added = session.execute(text(f"""
+        WITH new_rows AS (
+            INSERT INTO {table} ({columns}, is_precreated, created_at, updated_at)
+            SELECT {staged}, true, :now, :now
+            FROM seed_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM {manifest} i WHERE i.kind = :kind AND i.item_key = s.item_key)
+            ORDER BY s.ord
+            RETURNING id, {key_field}
+        )
+        INSERT INTO {manifest} (kind, item_key, item_hash, entity_id)
+        SELECT :kind, s.item_key, s.item_hash, n.id
+        FROM new_rows n JOIN seed_staging s ON s.{key_field} = n.{key_field}
+    """), params).rowcount
+
+    return total, added, updated
+
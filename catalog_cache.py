@@ -0,0 +1,315 @@
+"""
+In-process cache of the precreated catalog (missions, challenges, scenarios).
+
+The seeded rows only change when the seeding code runs, so every worker keeps
+them pre-serialized in memory. Routes only query the couple's custom rows and
+accepted ids, then overlay them on the cached entries.
+
+When Redis is available the serialized lists are also shared between the
+gunicorn workers, so a cold worker warms from Redis instead of Postgres.
+
+The entries are also kept JSON-encoded (see encode_catalog), so listing
+the precreated catalog does not re-encode it on every request.
+
+Every seeding path calls bump_catalog_version() after committing. That sets a
+new version stamp, drops the local snapshots and tells the other workers
+(over pub/sub) to drop theirs.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+import redis
+from models import Mission, Challenges, Scenario
+from json_provider import dumps_bytes, loads
+
+
+def serialize_content(item):
+    """Serialize a Mission or Challenges row (without the per-couple 'accepted' flag)"""
+    return {
+        'id': item.id,
+        'content': item.content,
+        'category': item.category,
+        'is_precreated': item.is_precreated,
+        'created_by': item.created_by,
+    }
+
+
+def serialize_scenario(scenario):
+    """Serialize a Scenario row (without the per-couple 'accepted' flag)"""
+    return {
+        'id': scenario.id,
+        'setting': scenario.setting,
+        'roles': scenario.roles,
+        'prompt': scenario.prompt,
+        'time': scenario.time,
+        'is_precreated': scenario.is_precreated,
+    }
+
+
+CATALOG_KINDS = {
+    'missions': (Mission, serialize_content),
+    'challenges': (Challenges, serialize_content),
+    'scenarios': (Scenario, serialize_scenario),
+}
+
+
+CATALOG_CHANNEL = 'catalog:invalidate'
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_REDIS_TTL = 24 * 3600   # seconds a serialized list stays in Redis
+CATALOG_LOCAL_TTL = 300         # seconds before a worker re-checks the shared version
+COUPLE_VERSIONS_TTL = 7 * 24 * 3600  # seconds a couple's versions outlive their last write (then re-minted)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_redis = None
+_version = uuid.uuid4().hex
+_checked_at = 0.0
+_snapshots = {}  # kind -> tuple of serialized precreated entries (ordered by id)
+_by_category = {}  # kind -> {category: tuple of entries}, built lazily from the snapshot
+_encoded = {}  # kind -> {id: JSON of the precreated entry without its opening brace}
+
+
+def init_catalog_cache(app, redis_client):
+    """
+    Share the catalog between workers through Redis.
+
+    Without a Redis client the cache stays process-local. With one, the
+    serialized lists are stored in Redis and every worker listens on
+    CATALOG_CHANNEL to drop its local copy when the catalog is re-seeded.
+    """
+    global _redis
+    _redis = redis_client
+    app.extensions['redis'] = redis_client
+    if redis_client is None:
+        return
+
+    _sync_version()
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{CATALOG_CHANNEL: _on_invalidate})
+        pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=_on_listener_error)
+    except redis.RedisError as e:
+        app.logger.warning(f"❌ Catalog invalidation listener not started: {e}")
+
+
+def _on_invalidate(message):
+    """Pub/sub handler: another process re-seeded the catalog"""
+    _set_version(message['data'])
+
+
+def _on_listener_error(error, pubsub, thread):
+    # Keep the listener thread alive, redis-py resubscribes on reconnect
+    logger.warning(f"Catalog invalidation listener error: {error}")
+    time.sleep(1.0)
+
+
+def _set_version(version):
+    global _version, _checked_at
+    with _lock:
+        if version != _version:
+            _version = version
+            _snapshots.clear()
+            _by_category.clear()
+            _encoded.clear()
+        _checked_at = time.monotonic()
+
+
+def _sync_version():
+    """Adopt the shared version stamp from Redis (creating it if missing)"""
+    try:
+        _redis.set(CATALOG_VERSION_KEY, _version, nx=True)
+        _set_version(_redis.get(CATALOG_VERSION_KEY) or _version)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read catalog version from Redis: {e}")
+
+
+def catalog_version():
+    """Current version stamp of the precreated catalog"""
+    return _version
+
+
+def bump_catalog_version():
+    """Invalidate the cached catalog. Call after precreated rows were added/removed."""
+    version = uuid.uuid4().hex
+    _set_version(version)
+    if _redis is None:
+        return
+    try:
+        _redis.set(CATALOG_VERSION_KEY, version)
+        _redis.publish(CATALOG_CHANNEL, version)
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish catalog invalidation: {e}")
+
+
+def _redis_key(version, kind):
+    return f"catalog:{version}:{kind}"
+
+
+def _load_shared(version, kind):
+    if _redis is None:
+        return None
+    try:
+        cached = _redis.get(_redis_key(version, kind))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read catalog from Redis: {e}")
+        return None
+    return tuple(loads(cached)) if cached else None
+
+
+def _store_shared(version, kind, snapshot):
+    if _redis is None:
+        return
+    try:
+        _redis.set(_redis_key(version, kind), dumps_bytes(snapshot), ex=CATALOG_REDIS_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Could not store catalog in Redis: {e}")
+
+
+def get_precreated(kind, category=None):
+    """
+    Return the serialized precreated entries of a kind, ordered by id.
+    With a category, only the entries of that category (missions and challenges).
+
+    Lookup order: this worker's memory, then Redis, then the database.
+    """
+    snapshot = _get_snapshot(kind)
+    if category is None:
+        return snapshot
+
+    index = _by_category.get(kind)
+    if index is None:
+        index = {}
+        for entry in snapshot:
+            index.setdefault(entry['category'], []).append(entry)
+        index = {name: tuple(entries) for name, entries in index.items()}
+        with _lock:
+            if _snapshots.get(kind) is snapshot:
+                _by_category[kind] = index
+    return index.get(category, ())
+
+
+def _get_snapshot(kind):
+    # Safety net in case an invalidation message was missed
+    if _redis is not None and time.monotonic() - _checked_at > CATALOG_LOCAL_TTL:
+        _sync_version()
+
+    snapshot = _snapshots.get(kind)
+    if snapshot is not None:
+        return snapshot
+
+    with _lock:
+        version = _version
+
+    snapshot = _load_shared(version, kind)
+    if snapshot is None:
+        model, serializer = CATALOG_KINDS[kind]
+        rows = model.query.filter_by(is_precreated=True).order_by(model.id).all()
+        snapshot = tuple(serializer(row) for row in rows)
+        _store_shared(version, kind, snapshot)
+
+    # Keys are sorted and 'accepted' sorts first, so the per-couple flag can be
+    # prepended to the cached bytes (encode_catalog)
+    encoded = {entry['id']: dumps_bytes(entry)[1:] for entry in snapshot}
+
+    # Only store it if nobody bumped the version while we were loading
+    with _lock:
+        if _version == version:
+            _snapshots[kind] = snapshot
+            _encoded[kind] = encoded
+
+    return snapshot
+
+
+def _couple_key(couple_id):
+    return f"couple:{couple_id}:catalog"
+
+
+def bump_couple_version(couple_id, kind, part):
+    """
+    Record that a couple's view of a catalog kind changed.
+
+    part is 'custom' (the couple created/deleted its own rows) or
+    'accepted' (the couple accepted/unliked something).
+    """
+    if _redis is None:
+        return
+    key = _couple_key(couple_id)
+    try:
+        pipe = _redis.pipeline(transaction=False)
+        pipe.hset(key, f"{kind}:{part}", uuid.uuid4().hex)
+        pipe.expire(key, COUPLE_VERSIONS_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not bump catalog version of couple {couple_id}: {e}")
+
+
+def forget_couple_versions(couple_id):
+    """Invalidate every catalog version of a couple (e.g. when a member is deleted)"""
+    if _redis is None:
+        return
+    try:
+        _redis.delete(_couple_key(couple_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not reset catalog versions of couple {couple_id}: {e}")
+
+
+def catalog_etag(couple_id, kind, variant=''):
+    """
+    ETag of a couple's listing of a catalog kind, or None when it can't be computed.
+
+    Built from the catalog version, the couple's custom-content version and
+    its accepted-set version. variant distinguishes listings of the same data
+    (e.g. the query string of a filtered page). The per-couple versions live in Redis, so
+    without Redis there is no ETag and responses are never 304.
+    """
+    if _redis is None:
+        return None
+
+    key = _couple_key(couple_id)
+    fields = (f"{kind}:custom", f"{kind}:accepted")
+    try:
+        versions = _redis.hmget(key, fields)
+        if None in versions:
+            # Unknown (new or evicted) versions get a fresh random token, never a reused one
+            pipe = _redis.pipeline(transaction=False)
+            for field, version in zip(fields, versions):
+                if version is None:
+                    pipe.hsetnx(key, field, uuid.uuid4().hex)
+            # Couples that stop listing (or were deleted) do not keep a key forever
+            pipe.expire(key, COUPLE_VERSIONS_TTL)
+            pipe.hmget(key, fields)
+            versions = pipe.execute()[-1]
+    except redis.RedisError as e:
+        logger.warning(f"Could not read catalog versions of couple {couple_id}: {e}")
+        return None
+    if None in versions:
+        return None
+
+    stamp = ':'.join([kind, catalog_version(), *versions, variant])
+    return hashlib.blake2b(stamp.encode(), digest_size=16).hexdigest()
+
+
+def overlay_accepted(entries, accepted_ids):
+    """Copy the cached entries adding the couple's 'accepted' flag"""
+    return [dict(entry, accepted=entry['id'] in accepted_ids) for entry in entries]
+
+
+def encode_catalog(kind, entries, accepted_ids):
+    """
+    JSON array (bytes) of catalog entries with the couple's 'accepted' flag,
+    the same as encoding overlay_accepted(entries, accepted_ids). Precreated
+    entries reuse their cached encoding, only the couple's own rows are encoded.
+    """
+    encoded = _encoded.get(kind, {})
+    parts = []
+    for entry in entries:
+        body = encoded.get(entry['id'])
+        if body is None:
+            body = dumps_bytes(entry)[1:]
+        flag = b'{"accepted":true,' if entry['id'] in accepted_ids else b'{"accepted":false,'
+        parts.append(flag + body)
+    return b'[' + b','.join(parts) + b']'
+
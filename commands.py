@@ -1,21 +1,44 @@
+import csv
+import time
 import click
+from flask import current_app
 from flask.cli import with_appcontext
-from models import db, Mission, Challenges, Scenario
-from seed_missions import precreated_missions
-from seed_challenges import precreated_challenges  
-from seed_scenarios import precreated_scenarios
-from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Mission, Challenges, Scenario, ErasureJob
+from catalog_cache import bump_catalog_version
+from seeding import SEED_FILES, seed_kind, forget_seed
+from bulk_load import read_items, load_items
+from sync import ACCEPTANCE_KINDS, record_tombstones, prune_tombstones
+from bootstrap import auto_initialize_database
+from erasure import run_erasure_jobs, retry_job
+from counters import uncount_acceptances, reconcile_counters
 
 # PRODUCTION NOTE:
 
 """
 export FLASK_APP=app.py
 
+# Runs automatically in the release phase (see Procfile): creates tables and
+# seeds new or changed content, skipped when the seed files did not change
+flask bootstrap
+
 flask init-db
 flask seed-all
 
 # If you want to add new content later, just add new items to your seed files, then run:
-flask seed-missions  # Only adds new ones!
+flask seed-missions  # Only writes new or changed ones!
+
+# Large content packs (JSON Lines or CSV, same fields as the seed files):
+flask load-content missions missions_it.jsonl
+
+# Account deletions run in the background, to inspect or push them:
+flask erasure-jobs --status failed
+flask erasure-retry 42
+flask erasure-run
+
+# Check the per-couple counters against the tables (--fix corrects them):
+flask counters-check --fix
 
 """
 
@@ -55,6 +78,18 @@ def init_db():
     db.create_all()
     click.echo('Initialized database tables.')
 
+@click.command()
+@click.option('--force', is_flag=True, help='Seed even if the seed files did not change')
+@with_appcontext
+def bootstrap(force):
+    """Create tables and seed precreated content, once per release."""
+    if auto_initialize_database(current_app, force=force):
+        click.echo('✅ Database bootstrapped')
+    else:
+        click.echo('❌ Bootstrap failed, see logs')
+        # Fails the release phase, workers must not start without tables or content
+        raise SystemExit(1)
+
 # flask seed-all --force
 @click.command()
 @click.option('--force', is_flag=True, help='Force recreate all seeds (deletes existing)')
@@ -63,14 +98,15 @@ def seed_all(force):
     """Seed all data (missions, challenges, scenarios)."""
     if force:
         click.echo('🗑️  Deleting existing seeds...')
-        Mission.query.filter_by(is_precreated=True).delete()
-        Challenges.query.filter_by(is_precreated=True).delete()
-        Scenario.query.filter_by(is_precreated=True).delete()
+        delete_precreated(Mission, 'missions')
+        delete_precreated(Challenges, 'challenges')
+        delete_precreated(Scenario, 'scenarios')
         db.session.commit()
+        bump_catalog_version()
     
-    seed_missions_data()
-    seed_challenges_data()
-    seed_scenarios_data()
+    seed_data('missions')
+    seed_data('challenges')
+    seed_data('scenarios')
     
     click.echo('✅ All seeding completed!')
 
@@ -81,10 +117,11 @@ def seed_all(force):
 def seed_missions_cmd(force):
     """Seed missions only."""
     if force:
-        Mission.query.filter_by(is_precreated=True).delete()
+        delete_precreated(Mission, 'missions')
         db.session.commit()
+        bump_catalog_version()
     
-    seed_missions_data()
+    seed_data('missions')
 
 
 @click.command()
@@ -93,10 +130,11 @@ def seed_missions_cmd(force):
 def seed_challenges_cmd(force):
     """Seed challenges only."""
     if force:
-        Challenges.query.filter_by(is_precreated=True).delete()
+        delete_precreated(Challenges, 'challenges')
         db.session.commit()
+        bump_catalog_version()
     
-    seed_challenges_data()
+    seed_data('challenges')
 
 
 @click.command()
@@ -105,84 +143,154 @@ def seed_challenges_cmd(force):
 def seed_scenarios_cmd(force):
     """Seed scenarios only."""
     if force:
-        Scenario.query.filter_by(is_precreated=True).delete()
+        delete_precreated(Scenario, 'scenarios')
         db.session.commit()
+        bump_catalog_version()
     
-    seed_scenarios_data()
+    seed_data('scenarios')
 
 
-def seed_missions_data():
-    """Smart seeding for missions - only adds new ones."""
-    existing_contents = {m.content for m in Mission.query.filter_by(is_precreated=True).all()}
-    new_missions = []
-    
-    for mission_data in precreated_missions:
-        if mission_data["content"] not in existing_contents:
-            new_missions.append(Mission(
-                content=mission_data["content"],
-                category=mission_data["category"],
-                is_precreated=True,
-                created_at=datetime.utcnow()
-            ))
-    
-    if new_missions:
-        db.session.bulk_save_objects(new_missions)
+def delete_precreated(model, kind):
+    """Delete the precreated rows of a model, leaving tombstones for the delta sync"""
+    ids = [id for (id,) in db.session.query(model.id).filter_by(is_precreated=True)]
+    record_tombstones(kind, ids)
+    # Their acceptances cascade in the database, the couples' counters follow
+    _, link_model, column_name = ACCEPTANCE_KINDS[kind]
+    uncount_acceptances(kind, getattr(link_model, column_name).in_(select(model.id).filter_by(is_precreated=True)))
+    model.query.filter_by(is_precreated=True).delete()
+    # The seed file must be replayed in full
+    forget_seed(kind)
+
+
+# flask load-content missions pack_it.jsonl
+@click.command()
+@click.argument('kind', type=click.Choice(list(SEED_FILES)))
+@click.argument('path', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='File format (default: from the extension)')
+@with_appcontext
+def load_content(kind, path, fmt):
+    """Bulk-load a content pack (JSON Lines or CSV). Without PATH, loads the built-in seed list."""
+    items = read_items(kind, path, fmt) if path else SEED_FILES[kind][1]
+    started = time.perf_counter()
+    try:
+        total, added, updated = load_items(kind, items)
         db.session.commit()
-        click.echo(f'✅ Added {len(new_missions)} new missions')
+    except (ValueError, OSError, csv.Error, SQLAlchemyError) as e:
+        db.session.rollback()
+        click.echo(f'❌ Load failed, nothing was written: {e}')
+        raise SystemExit(1)
+    elapsed = time.perf_counter() - started
+
+    if added or updated:
+        bump_catalog_version()
+    click.echo(
+        f'✅ Loaded {total} {kind} in {elapsed:.2f}s ({total / max(elapsed, 1e-6):.0f} items/s): '
+        f'{added} added, {updated} updated'
+    )
+
+
+@click.command()
+@with_appcontext
+def prune_tombstones_cmd():
+    """Delete sync tombstones older than the retention period."""
+    removed = prune_tombstones()
+    click.echo(f'🗑️  Removed {removed} old sync tombstones')
+
+
+@click.command()
+@with_appcontext
+def erasure_run():
+    """Run the due account erasure jobs now."""
+    total = {}
+    while True:
+        results = run_erasure_jobs()
+        if not results:
+            break
+        for status, count in results.items():
+            total[status] = total.get(status, 0) + count
+    if total:
+        click.echo('✅ Erasure jobs run: ' + ', '.join(f'{count} {status}' for status, count in total.items()))
     else:
-        click.echo('ℹ️  No new missions to add')
+        click.echo('ℹ️  No erasure job due')
 
 
-def seed_challenges_data():
-    """Smart seeding for challenges - only adds new ones."""
-    existing_contents = {c.content for c in Challenges.query.filter_by(is_precreated=True).all()}
-    new_challenges = []
-    
-    for challenge_data in precreated_challenges:
-        if challenge_data["content"] not in existing_contents:
-            new_challenges.append(Challenges(
-                content=challenge_data["content"],
-                category=challenge_data["category"],
-                is_precreated=True,
-                created_at=datetime.utcnow()
-            ))
-    
-    if new_challenges:
-        db.session.bulk_save_objects(new_challenges)
-        db.session.commit()
-        click.echo(f'✅ Added {len(new_challenges)} new challenges')
+@click.command()
+@click.option('--status', type=click.Choice(['pending', 'running', 'done', 'failed']), help='Only jobs in this status')
+@click.option('--limit', default=20, show_default=True, help='Number of jobs (newest first)')
+@with_appcontext
+def erasure_jobs(status, limit):
+    """List account erasure jobs with their progress."""
+    query = ErasureJob.query.order_by(ErasureJob.id.desc())
+    if status:
+        query = query.filter_by(status=status)
+    jobs = query.limit(limit).all()
+    if not jobs:
+        click.echo('ℹ️  No erasure jobs')
+    for job in jobs:
+        click.echo(
+            f'#{job.id} user {job.user_id} couple {job.couple_id}: {job.status}, step {job.step or "-"}, '
+            f'{job.rows_deleted} rows deleted, {job.attempts} attempts, created {job.created_at:%Y-%m-%d %H:%M:%S}'
+        )
+        if job.last_error:
+            click.echo(f'    last error: {job.last_error}')
+
+
+@click.command()
+@click.argument('job_id', type=int)
+@with_appcontext
+def erasure_retry(job_id):
+    """Queue a failed account erasure job again."""
+    if retry_job(job_id):
+        click.echo(f'✅ Erasure job #{job_id} queued again')
     else:
-        click.echo('ℹ️  No new challenges to add')
+        click.echo(f'❌ Erasure job #{job_id} not found or not failed')
+        raise SystemExit(1)
 
 
-def seed_scenarios_data():
-    """Smart seeding for scenarios - only adds new ones."""
-    existing_prompts = {s.prompt for s in Scenario.query.filter_by(is_precreated=True).all()}
-    new_scenarios = []
-    
-    for scenario_data in precreated_scenarios:
-        if scenario_data["prompt"] not in existing_prompts:
-            new_scenarios.append(Scenario(
-                setting=scenario_data["setting"],
-                roles=scenario_data["roles"],
-                prompt=scenario_data["prompt"],
-                time=scenario_data.get("time"),
-                is_precreated=True,
-                created_at=datetime.utcnow()
-            ))
-    
-    if new_scenarios:
-        db.session.bulk_save_objects(new_scenarios)
-        db.session.commit()
-        click.echo(f'✅ Added {len(new_scenarios)} new scenarios')
+@click.command()
+@click.option('--fix', is_flag=True, help='Write the recomputed values of the drifted counters')
+@with_appcontext
+def counters_check(fix):
+    """Check the per-couple counters against the tables."""
+    drifted = reconcile_counters(fix=fix)
+    if not drifted:
+        click.echo('✅ All couple counters match')
+        return
+    for couple_id, diff in drifted:
+        click.echo(f'couple {couple_id}: ' + ', '.join(
+            f'{name} {stored} -> {actual}' for name, (stored, actual) in diff.items()
+        ))
+    if fix:
+        click.echo(f'✅ Fixed the counters of {len(drifted)} couples')
+    else:
+        click.echo(f'❌ {len(drifted)} couples have drifted counters, run with --fix to correct them')
+        raise SystemExit(1)
+
+
+def seed_data(kind):
+    """Smart seeding - only writes the items that are new or changed in the seed file."""
+    result = seed_kind(kind)
+    if result is None:
+        click.echo(f'ℹ️  {kind.capitalize()} seed file unchanged, nothing to do')
+        return
+    added, updated = result
+    if added or updated:
+        click.echo(f'✅ Added {added} new {kind}, updated {updated}')
     else:
-        click.echo('ℹ️  No new scenarios to add')
+        click.echo(f'ℹ️  No new {kind} to add')
 
 
 def register_commands(app):
     """Register all commands with the app."""
     app.cli.add_command(init_db, name='init-db')
+    app.cli.add_command(bootstrap, name='bootstrap')
     app.cli.add_command(seed_all, name='seed-all')
     app.cli.add_command(seed_missions_cmd, name='seed-missions')
     app.cli.add_command(seed_challenges_cmd, name='seed-challenges') 
-    app.cli.add_command(seed_scenarios_cmd, name='seed-scenarios')
\ No newline at end of file
+    app.cli.add_command(seed_scenarios_cmd, name='seed-scenarios')
+    app.cli.add_command(load_content, name='load-content')
+    app.cli.add_command(prune_tombstones_cmd, name='prune-tombstones')
+    app.cli.add_command(erasure_run, name='erasure-run')
+    app.cli.add_command(erasure_jobs, name='erasure-jobs')
+    app.cli.add_command(erasure_retry, name='erasure-retry')
+    app.cli.add_command(counters_check, name='counters-check')
\ No newline at end of file
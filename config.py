@@ -1,10 +1,59 @@
 import os 
 from datetime import timedelta
+from db_pool import TimedQueuePool
+
+# Engine settings per deployment profile (DB_PROFILE), each overridable with the
+# matching DB_* variable. Sizes are per process: a gunicorn worker may use up to
+# pool_size + max_overflow connections, then waits up to pool_timeout seconds.
+ENGINE_PROFILES = {
+    # gunicorn web workers: short statements, bursts wait briefly instead of piling up
+    'web': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 10, 'pool_recycle': 1800, 'statement_timeout_ms': 5000},
+    # release phase and CLI commands (bootstrap, seeding, bulk loads): long statements allowed.
+    # bootstrap holds its advisory lock connection next to the session and create_all's connection
+    'cli': {'pool_size': 2, 'max_overflow': 2, 'pool_timeout': 30, 'pool_recycle': 1800, 'statement_timeout_ms': 0},
+}
+
+
+def _engine_setting(name, default):
+    """A profile setting, or its DB_* override (pool_timeout may be fractional)"""
+    variable = f"DB_{name.upper()}"
+    value = os.getenv(variable)
+    if value is None:
+        return default
+    try:
+        return float(value) if name == 'pool_timeout' else int(value)
+    except ValueError:
+        raise ValueError(f"{variable} must be a number, got {value!r}") from None
+
+
+def engine_options(database_url, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile (pool and session settings are Postgres only)"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {', '.join(ENGINE_PROFILES)}")
+    if not database_url or not database_url.startswith(('postgresql', 'postgres:')):
+        # SQLite (local development) keeps SQLAlchemy's defaults
+        return {}
+
+    settings = {name: _engine_setting(name, default) for name, default in ENGINE_PROFILES[profile].items()}
+    options = f"-c statement_timeout={settings.pop('statement_timeout_ms')}"
+    return {
+        **settings,
+        'poolclass': TimedQueuePool,
+        # Connections dropped by the server (restarts, idle timeouts) are replaced before use
+        'pool_pre_ping': True,
+        'connect_args': {
+            'options': options,
+            'application_name': os.getenv('DB_APPLICATION_NAME', f"memoriesdb-{profile}"),
+        },
+    }
+
 
 class Config: 
     SECRET_KEY = os.getenv('SECRET_KEY') #Flask uses SECRET_KEY to sign session cookies. This prevents users from tampering with the session data stored in their browser.
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_PROFILE = os.getenv('DB_PROFILE', 'web')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, DB_PROFILE)
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY') # used to sign JWT tokens
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
@@ -15,4 +64,17 @@ class Config:
     JWT_CSRF_CHECK_FORM = False
 
     REDIS_URL = os.getenv('REDIS_URL')
-    RATELIMIT_STORAGE_URL = REDIS_URL
\ No newline at end of file
+    RATELIMIT_STORAGE_URL = REDIS_URL
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    # Seconds before a slow Redis counts as down (rate limiting then fails open for a while)
+    RATELIMIT_REDIS_TIMEOUT = float(os.getenv('RATELIMIT_REDIS_TIMEOUT', '0.1'))
+    # In-process token bucket rejecting floods before they reach Redis
+    RATELIMIT_LOCAL_PREFILTER = os.getenv('RATELIMIT_LOCAL_PREFILTER', 'true').lower() == 'true'
+
+    # Create tables and seed on app startup (local development). In production the
+    # release phase runs `flask bootstrap` once instead of every worker doing it.
+    DB_BOOTSTRAP_ON_START = os.getenv('DB_BOOTSTRAP_ON_START', 'false').lower() == 'true'
+
+    # Background purge of deleted accounts (erasure.py), polled by every web worker
+    ERASURE_WORKER = os.getenv('ERASURE_WORKER', 'true').lower() == 'true'
+    ERASURE_POLL_SECONDS = int(os.getenv('ERASURE_POLL_SECONDS', '10'))
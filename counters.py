@@ -0,0 +1,118 @@
+"""
+Per-couple counters.
+
+Couple keeps the number of its members and of the missions and challenges it
+created or accepted, so the creation quotas and the couple profile read one
+row instead of counting. Every path that writes the counted rows updates the
+counters in the same transaction, with relative UPDATEs (count = count + n)
+so concurrent requests never overwrite each other. A quota is taken with a
+conditional UPDATE, which also closes the count-then-insert race.
+
+Accepted counters count the acceptances of content that still exists.
+`flask counters-check` recomputes every counter from the tables and reports
+(with --fix, corrects) the couples that drifted.
+"""
+from sqlalchemy import select, update, func
+from models import db, User, Couple, Mission, Challenges
+from sync import ACCEPTANCE_KINDS
+
+MAX_COUPLE_MEMBERS = 2
+MAX_CUSTOM_ITEMS = 5  # missions and challenges created by a couple, per kind
+RECONCILE_BATCH = 1000  # couples checked per transaction
+
+COUNTERS = (
+    'members_count',
+    'custom_missions_count', 'custom_challenges_count',
+    'accepted_missions_count', 'accepted_challenges_count', 'accepted_scenarios_count',
+)
+
+
+def adjust_counters(couple_id, **deltas):
+    """Add deltas to a couple's counters (accepted_missions_count=1, ...), in the current transaction"""
+    values = {name: getattr(Couple, name) + delta for name, delta in deltas.items() if delta}
+    if values:
+        db.session.execute(update(Couple).where(Couple.id == couple_id).values(values))
+
+
+def take_slot(couple_id, counter, limit, *criteria):
+    """
+    Increment a counter unless it reached limit (or the couple row does not
+    match criteria), in the current transaction. Returns False at the limit.
+    """
+    column = getattr(Couple, counter)
+    return db.session.execute(
+        update(Couple).where(Couple.id == couple_id, column < limit, *criteria).values({counter: column + 1})
+    ).rowcount == 1
+
+
+def uncount_acceptances(kind, *criteria):
+    """
+    Decrement the accepted counter of every couple holding acceptances of kind
+    matching criteria. Call it before deleting them, or the content they point to.
+    """
+    _, link_model, _ = ACCEPTANCE_KINDS[kind]
+    counter = f'accepted_{kind}_count'
+    lost = select(func.count()).select_from(link_model).where(link_model.couple_id == Couple.id, *criteria)
+    db.session.execute(
+        update(Couple)
+        .where(Couple.id.in_(select(link_model.couple_id).where(*criteria)))
+        .values({counter: getattr(Couple, counter) - lost.scalar_subquery()})
+    )
+
+
+def actual_counters():
+    """Counter name -> subquery computing its true value, correlated with Couple"""
+    def count(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+    actual = {
+        'members_count': count(User, User.couple_id == Couple.id, User.deletion_requested_at.is_(None)),
+        'custom_missions_count': count(Mission, Mission.created_by == Couple.id),
+        'custom_challenges_count': count(Challenges, Challenges.created_by == Couple.id),
+    }
+    for kind, (content_model, link_model, column_name) in ACCEPTANCE_KINDS.items():
+        actual[f'accepted_{kind}_count'] = (
+            select(func.count()).select_from(link_model)
+            .join(content_model, content_model.id == getattr(link_model, column_name))
+            .where(link_model.couple_id == Couple.id)
+            .scalar_subquery()
+        )
+    return actual
+
+
+def reconcile_counters(fix=False):
+    """
+    Compare the stored counters with the tables, RECONCILE_BATCH couples at a time.
+    With fix, the drifted couples get the recomputed values.
+    Returns [(couple_id, {counter: (stored, actual)})] for the drifted couples.
+    """
+    actual = actual_counters()
+    query = select(Couple.id, *(getattr(Couple, name) for name in COUNTERS), *(actual[name] for name in COUNTERS))
+
+    drifted = []
+    after_id = 0
+    while True:
+        rows = db.session.execute(query.where(Couple.id > after_id).order_by(Couple.id).limit(RECONCILE_BATCH)).all()
+        if not rows:
+            break
+        after_id = rows[-1][0]
+
+        batch = []
+        for couple_id, *values in rows:
+            stored, computed = values[:len(COUNTERS)], values[len(COUNTERS):]
+            diff = {name: (s, c) for name, s, c in zip(COUNTERS, stored, computed) if s != c}
+            if diff:
+                batch.append((couple_id, diff))
+
+        if fix and batch:
+            ids = [couple_id for couple_id, _ in batch]
+            # Lock the rows before counting again: writers that already counted commit first,
+            # the later ones wait and apply their change on top of the recomputed value
+            db.session.execute(select(Couple.id).where(Couple.id.in_(ids)).with_for_update())
+            db.session.execute(
+                update(Couple).where(Couple.id.in_(ids)).values(actual),
+                execution_options={'synchronize_session': False},
+            )
+        db.session.commit()
+        drifted.extend(batch)
+    return drifted
@@ -0,0 +1,48 @@
+"""
+Dialect-aware statement helpers.
+
+Postgres is used in production and SQLite for local runs; both support
+INSERT ... ON CONFLICT and RETURNING through their SQLAlchemy dialects.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db
+
+
+def dialect_insert(model):
+    """insert() construct of the current database dialect (supports on_conflict_*)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+
+def insert_if_absent(model, conflict_columns, **values):
+    """
+    INSERT ... ON CONFLICT DO NOTHING in a single statement.
+    Returns True when the row was new, False when it already existed.
+    """
+    stmt = (
+        dialect_insert(model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=conflict_columns)
+        .returning(model.id)
+    )
+    return db.session.execute(stmt).first() is not None
+
+
+def insert_many_if_absent(model, conflict_columns, rows, returning):
+    """
+    Multi-row INSERT ... ON CONFLICT DO NOTHING in a single statement.
+    Returns the set of `returning` values of the rows actually inserted.
+    """
+    if not rows:
+        return set()
+    stmt = (
+        dialect_insert(model)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=conflict_columns)
+        .returning(returning)
+    )
+    return set(db.session.execute(stmt).scalars())
@@ -0,0 +1,85 @@
+"""
+Connection pool instrumentation.
+
+TimedQueuePool is SQLAlchemy's QueuePool timing every checkout: the time a
+request waits for a free connection (or for a new one to be opened) and the
+checkouts that gave up after pool_timeout. The numbers are per process and
+reported by /health; checkouts slower than DB_POOL_SLOW_CHECKOUT_MS are logged.
+"""
+import logging
+import os
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+SLOW_CHECKOUT = float(os.getenv('DB_POOL_SLOW_CHECKOUT_MS', '100')) / 1000
+
+
+class PoolMetrics:
+    """Checkout wait statistics since the process started"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if timed_out:
+                self.timeouts += 1
+            elif wait >= SLOW_CHECKOUT:
+                self.slow_checkouts += 1
+        if timed_out:
+            logger.warning(f"Database pool exhausted, checkout timed out after {wait * 1000:.0f} ms")
+        elif wait >= SLOW_CHECKOUT:
+            logger.warning(f"Slow database pool checkout: {wait * 1000:.0f} ms")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited in pool_metrics"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - started)
+        return connection
+
+
+def pool_status(engine):
+    """Current pool occupancy and checkout statistics of an engine"""
+    status = {'class': type(engine.pool).__name__}
+    if isinstance(engine.pool, QueuePool):
+        status.update(
+            size=engine.pool.size(),
+            checked_out=engine.pool.checkedout(),
+            overflow=max(engine.pool.overflow(), 0),
+        )
+    if isinstance(engine.pool, TimedQueuePool):
+        status.update(pool_metrics.snapshot())
+    return status
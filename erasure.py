@@ -0,0 +1,157 @@
+"""
+Background account erasure.
+
+DELETE /users/delete only marks the user (deletion_requested_at), queues an
+ErasureJob and revokes the tokens. The purge itself (accounts.purge_account)
+runs here in bounded batches, from an APScheduler job polling in every web
+worker, or on demand with `flask erasure-run`.
+
+Jobs are claimed with a lease, so several workers can poll the same table:
+a running job is only picked up again once its lease expired (its worker
+died). Failed attempts are retried with exponential backoff; after
+ERASURE_MAX_ATTEMPTS the job is 'failed' until `flask erasure-retry`.
+Progress (step, rows deleted, attempts, last error) is kept on the job row,
+see `flask erasure-jobs`.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import select, update, exists, and_, or_
+from models import db, User, Couple, ErasureJob
+from accounts import purge_account
+from counters import adjust_counters
+from catalog_cache import forget_couple_versions
+
+logger = logging.getLogger(__name__)
+
+ERASURE_MAX_ATTEMPTS = 5
+ERASURE_RETRY_DELAY = timedelta(seconds=30)  # doubled after every failed attempt
+ERASURE_LEASE = timedelta(minutes=5)         # renewed after every batch
+ERASURE_JOBS_PER_RUN = 10
+
+
+def request_erasure(user_id, couple_id):
+    """
+    Mark the user for deletion and queue the purge, in the current transaction.
+    Only the first request queues a job. Returns True when it was this one.
+    """
+    marked = db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.deletion_requested_at.is_(None))
+        .values(deletion_requested_at=datetime.now())
+    ).rowcount
+    if marked:
+        db.session.add(ErasureJob(user_id=user_id, couple_id=couple_id))
+        # The seat is free as soon as the account is unusable
+        adjust_counters(couple_id, members_count=-1)
+        # Without an active member the couple is being purged: its invitation code stops working.
+        # Runs after the counter update, which waits on the couple row for a concurrent erasure.
+        db.session.execute(
+            update(Couple)
+            .where(Couple.id == couple_id,
+                   ~exists().where(User.couple_id == couple_id, User.deletion_requested_at.is_(None)))
+            .values(invitation_code=str(uuid.uuid4()))
+        )
+    return marked == 1
+
+
+def _due(now):
+    return or_(
+        and_(ErasureJob.status == 'pending', ErasureJob.run_after <= now),
+        and_(ErasureJob.status == 'running', ErasureJob.lease_until < now),
+    )
+
+
+def _claim(job_id):
+    """Take a due job for this worker, False when it is not due anymore (another worker got it)"""
+    now = datetime.now()
+    claimed = db.session.execute(
+        update(ErasureJob)
+        .where(ErasureJob.id == job_id, _due(now))
+        .values(status='running', lease_until=now + ERASURE_LEASE, attempts=ErasureJob.attempts + 1)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def run_job(job_id):
+    """Claim and run one job, committing after every batch. Returns its new status, None when not claimed."""
+    if not _claim(job_id):
+        return None
+    job = db.session.get(ErasureJob, job_id)
+    user_id, couple_id = job.user_id, job.couple_id
+
+    try:
+        for step, deleted in purge_account(user_id, couple_id):
+            job.step = step
+            job.rows_deleted += deleted
+            job.lease_until = datetime.now() + ERASURE_LEASE
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(ErasureJob, job_id)
+        job.last_error = f"{type(e).__name__}: {e}"[:2000]
+        job.lease_until = None
+        if job.attempts >= ERASURE_MAX_ATTEMPTS:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            job.run_after = datetime.now() + ERASURE_RETRY_DELAY * 2 ** (job.attempts - 1)
+        db.session.commit()
+        logger.error(f"❌ Erasure of user {user_id} failed (attempt {job.attempts}, now {job.status}): {e}")
+        return job.status
+
+    job.status = 'done'
+    job.lease_until = None
+    job.last_error = None
+    job.finished_at = datetime.now()
+    db.session.commit()
+    # The partner's listings lost the user's scenarios
+    forget_couple_versions(couple_id)
+    logger.info(f"✅ Erased user {user_id}: {job.rows_deleted} rows deleted")
+    return 'done'
+
+
+def run_erasure_jobs(limit=ERASURE_JOBS_PER_RUN):
+    """Run the due jobs, oldest first (at most limit). Returns {status: number of jobs}."""
+    job_ids = db.session.scalars(
+        select(ErasureJob.id).where(_due(datetime.now())).order_by(ErasureJob.id).limit(limit)
+    ).all()
+    db.session.commit()
+
+    results = {}
+    for job_id in job_ids:
+        status = run_job(job_id)
+        if status is not None:
+            results[status] = results.get(status, 0) + 1
+    return results
+
+
+def retry_job(job_id):
+    """Queue a failed job again with a fresh attempt count. Returns False when it is not failed."""
+    retried = db.session.execute(
+        update(ErasureJob)
+        .where(ErasureJob.id == job_id, ErasureJob.status == 'failed')
+        .values(status='pending', attempts=0, run_after=datetime.now())
+    ).rowcount
+    db.session.commit()
+    return retried == 1
+
+
+def start_erasure_worker(app):
+    """Poll for due jobs every ERASURE_POLL_SECONDS in a background thread of this process"""
+    def tick():
+        with app.app_context():
+            try:
+                run_erasure_jobs()
+            except Exception as e:
+                # Keep polling, the jobs are still due at the next tick
+                db.session.rollback()
+                logger.error(f"❌ Erasure worker tick failed: {e}")
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(tick, 'interval', seconds=app.config['ERASURE_POLL_SECONDS'],
+                      id='erasure', max_instances=1, coalesce=True)
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,134 @@
+"""
+Google ID token verification with cached signing certificates.
+
+id_token.verify_oauth2_token() downloads Google's certificates on every call.
+Here they are kept in memory for as long as Google's Cache-Control allows,
+refreshed ahead of expiry by a background thread, and fetched through one
+pooled HTTP session.
+
+The certificate source is injectable: set GOOGLE_CERTS_FILE to a JSON file
+({"key id": "PEM certificate", ...}) for tests/offline runs, or call
+set_cert_source() with any callable returning (certs, max_age_seconds).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import requests
+from google.auth import jwt
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+DEFAULT_MAX_AGE = 3600      # used when the response has no max-age
+REFRESH_MARGIN = 300        # refresh this many seconds before expiry
+RETRY_DELAY = 30            # wait after a failed background refresh
+STALE_GRACE = 24 * 3600     # keep using expired certs this long if Google can't be reached
+CLOCK_SKEW = 10
+
+logger = logging.getLogger(__name__)
+
+_session = requests.Session()
+
+
+def http_cert_source(url=GOOGLE_CERTS_URL, session=_session, timeout=5):
+    """Fetch the certificates over HTTPS, honoring the Cache-Control max-age"""
+    def fetch():
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        max_age = int(match.group(1)) if match else None
+        return response.json(), max_age
+    return fetch
+
+
+def file_cert_source(path):
+    """Read the certificates from a local JSON file (tests, offline runs)"""
+    def fetch():
+        with open(path) as f:
+            return json.load(f), None
+    return fetch
+
+
+class GoogleCertCache:
+    """Thread-safe in-memory cache of Google's signing certificates"""
+
+    def __init__(self, source):
+        self.source = source
+        self._certs = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def refresh(self):
+        """Fetch the certificates from the source and store them"""
+        certs, max_age = self.source()
+        with self._lock:
+            self._certs = certs
+            self._expires_at = time.monotonic() + (max_age if max_age is not None else DEFAULT_MAX_AGE)
+        return certs
+
+    def get(self):
+        """Return valid certificates, fetching them only when expired"""
+        certs, expires_at = self._certs, self._expires_at
+        if certs is not None and time.monotonic() < expires_at:
+            return certs
+        try:
+            return self.refresh()
+        except Exception as e:
+            if certs is not None and time.monotonic() < expires_at + STALE_GRACE:
+                logger.warning(f"Could not refresh Google certs, using the cached ones: {e}")
+                return certs
+            raise ValueError(f"Could not fetch Google certificates: {e}")
+
+    def start_refresher(self):
+        """Start a daemon thread that prefetches the certificates and renews them before expiry"""
+        if self._refresher is not None:
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop, name='google-certs', daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh()
+                delay = max(self._expires_at - time.monotonic() - REFRESH_MARGIN, RETRY_DELAY)
+            except Exception as e:
+                logger.warning(f"Background refresh of Google certs failed: {e}")
+                delay = RETRY_DELAY
+            time.sleep(delay)
+
+    def set_source(self, source):
+        """Swap the certificate source and drop what was cached"""
+        with self._lock:
+            self.source = source
+            self._certs = None
+            self._expires_at = 0.0
+
+
+def _default_source():
+    certs_file = os.getenv('GOOGLE_CERTS_FILE')
+    if certs_file:
+        return file_cert_source(certs_file)
+    return http_cert_source()
+
+
+cert_cache = GoogleCertCache(_default_source())
+
+
+def set_cert_source(source):
+    """Inject a certificate source (callable returning (certs, max_age_seconds))"""
+    cert_cache.set_source(source)
+
+
+def verify_google_id_token(token, audience):
+    """
+    Verify a Google ID token against the cached certificates.
+    Same contract as id_token.verify_oauth2_token: returns the claims, raises ValueError.
+    """
+    idinfo = jwt.decode(token, certs=cert_cache.get(), audience=audience, clock_skew_in_seconds=CLOCK_SKEW)
+    if idinfo.get('iss') not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}")
+    return idinfo
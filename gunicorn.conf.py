@@ -0,0 +1,33 @@
+"""
+Gunicorn settings, read from the working directory by `gunicorn app:app` (Procfile).
+
+GUNICORN_WORKER_CLASS selects how a worker process serves requests:
+
+- sync (default): one request at a time per worker
+- gthread: GUNICORN_THREADS requests at a time per worker, in threads
+- gevent: up to GUNICORN_WORKER_CONNECTIONS requests per worker, in greenlets.
+  gevent patches the sockets used by redis-py and the Google cert fetch, and
+  psycogreen makes psycopg2 cooperative, so a request waiting on Postgres,
+  Redis or Google does not block the other requests of the worker.
+
+The number of workers comes from WEB_CONCURRENCY, as before. With gthread and
+gevent a worker runs many requests against one connection pool: every request
+past DB_POOL_SIZE + DB_MAX_OVERFLOW waits up to DB_POOL_TIMEOUT for a connection
+(see config.ENGINE_PROFILES), so raise those with the concurrency.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+# gunicorn turns sync workers with threads > 1 into gthread ones
+threads = int(os.getenv('GUNICORN_THREADS', '8')) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 waits in C by default, which would block every greenlet of the worker
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        worker.log.info("psycopg2 patched for gevent")
@@ -0,0 +1,96 @@
+"""
+JSON encoding of the API responses.
+
+Uses orjson when it is installed and the standard library otherwise. Both
+give the same output: compact, keys sorted, UTF-8, and dates/datetimes in
+ISO 8601 (Flask's default provider writes HTTP dates), so routes can return
+datetime values as they are.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+
+def _default(o):
+    """Types neither encoder handles natively"""
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj, indent=False):
+        """Encode obj to JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+    loads = orjson.loads
+else:
+    def dumps_bytes(obj, indent=False):
+        """Encode obj to JSON bytes"""
+        return json.dumps(
+            obj, default=_default, sort_keys=True, ensure_ascii=False,
+            indent=2 if indent else None, separators=None if indent else (',', ':')
+        ).encode('utf-8')
+
+    loads = json.loads
+
+
+# FastJSONProvider.dumps() arguments orjson can honour
+# (a custom default goes to the standard library: orjson writes UUIDs itself, without calling it)
+_ORJSON_KWARGS = {'indent', 'sort_keys', 'ensure_ascii'}
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider built on dumps_bytes()/loads(), install with app.json = FastJSONProvider(app)"""
+
+    mimetype = 'application/json'
+    # None: indented in debug mode only, as Flask's default provider
+    compact = None
+
+    def dumps(self, obj, **kwargs):
+        """
+        Encode obj to a JSON str. indent=2, sort_keys and ensure_ascii=False map to
+        orjson options, other arguments go to the standard library encoder.
+        """
+        if not kwargs:
+            return dumps_bytes(obj).decode('utf-8')
+        if orjson is not None and set(kwargs) <= _ORJSON_KWARGS and kwargs.get('indent') in (None, 2) \
+                and kwargs.get('ensure_ascii') is not True:
+            option = orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', True):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+        # JSONProvider.dumps is abstract: the standard library encoder with this provider's defaults
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('sort_keys', True)
+        kwargs.setdefault('ensure_ascii', False)
+        if kwargs.get('indent') is None:
+            kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs) if kwargs else loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
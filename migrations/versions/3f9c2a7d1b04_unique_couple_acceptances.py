@@ -0,0 +1,54 @@
+"""unique couple acceptances
+
+Revision ID: 3f9c2a7d1b04
+Revises:
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b04'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (table, content column, unique constraint, composite index it replaces)
+ACCEPTANCE_TABLES = [
+    ('couples_missions', 'mission_id', 'uq_couple_mission', 'idx_couple_mission_couple_mission'),
+    ('couple_challenges', 'challenges_id', 'uq_couple_challenges', 'idx_couple_challenges_couple_challenge'),
+    ('couples_scenarios', 'scenario_id', 'uq_couple_scenario', 'idx_couple_scenario_couple_scenario'),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table, column, constraint, old_index in ACCEPTANCE_TABLES:
+        # Fresh database: `flask bootstrap` creates the tables from the models
+        if not inspector.has_table(table):
+            continue
+        # Tables created by db.create_all() on a fresh database already have the constraint
+        if constraint in {c['name'] for c in inspector.get_unique_constraints(table)}:
+            continue
+
+        # Keep the oldest acceptance of every (couple, content) pair
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY couple_id, {column})"
+        )
+
+        with op.batch_alter_table(table) as batch_op:
+            if old_index in {i['name'] for i in inspector.get_indexes(table)}:
+                batch_op.drop_index(old_index)
+            batch_op.create_unique_constraint(constraint, ['couple_id', column])
+
+
+def downgrade():
+    for table, column, constraint, old_index in ACCEPTANCE_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(constraint, type_='unique')
+            batch_op.create_index(old_index, ['couple_id', column])
@@ -0,0 +1,65 @@
+"""delta sync tracking
+
+Revision ID: 8b41d0e6c2f5
+Revises: 3f9c2a7d1b04
+Create Date: 2026-10-18 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41d0e6c2f5'
+down_revision = '3f9c2a7d1b04'
+branch_labels = None
+depends_on = None
+
+
+# (table, updated_at index)
+CONTENT_TABLES = [
+    ('missions', 'idx_mission_updated_at'),
+    ('challenges', 'idx_challenges_updated_at'),
+    ('scenarios', 'idx_scenario_updated_at'),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table, index in CONTENT_TABLES:
+        # Fresh database: `flask bootstrap` creates the tables from the models
+        if not inspector.has_table(table):
+            continue
+        if 'updated_at' in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.create_index(index, ['updated_at'])
+
+    if not inspector.has_table('sync_tombstones'):
+        op.create_table(
+            'sync_tombstones',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=30), nullable=False),
+            sa.Column('entity_id', sa.Integer(), nullable=False),
+            sa.Column('couple_id', sa.Integer(), nullable=True),
+            sa.Column('deleted_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('idx_sync_tombstone_deleted_at', 'sync_tombstones', ['deleted_at'])
+        op.create_index('idx_sync_tombstone_couple_id', 'sync_tombstones', ['couple_id'])
+
+
+def downgrade():
+    op.drop_index('idx_sync_tombstone_couple_id', table_name='sync_tombstones')
+    op.drop_index('idx_sync_tombstone_deleted_at', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+
+    for table, index in CONTENT_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(index)
+            batch_op.drop_column('updated_at')
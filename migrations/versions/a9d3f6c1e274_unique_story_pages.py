@@ -0,0 +1,51 @@
+"""unique story pages
+
+Revision ID: a9d3f6c1e274
+Revises: f4b8d2e6a157
+Create Date: 2026-10-18 23:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3f6c1e274'
+down_revision = 'f4b8d2e6a157'
+branch_labels = None
+depends_on = None
+
+
+TABLE = 'story_progress'
+CONSTRAINT = 'uq_story_progress_couple_page'
+OLD_INDEX = 'idx_story_progress_couple_page'  # composite index the constraint replaces
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    # Fresh database: `flask bootstrap` creates the tables from the models
+    if not inspector.has_table(TABLE):
+        return
+    # Tables created by db.create_all() on a fresh database already have the constraint
+    if CONSTRAINT in {c['name'] for c in inspector.get_unique_constraints(TABLE)}:
+        return
+
+    # Keep the most recently completed row of every (couple, page) pair
+    op.execute(
+        f"DELETE FROM {TABLE} WHERE id NOT IN ("
+        f"SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+        f"PARTITION BY couple_id, page_number ORDER BY completed_at DESC, id DESC) AS position "
+        f"FROM {TABLE}) ranked WHERE position = 1)"
+    )
+
+    with op.batch_alter_table(TABLE) as batch_op:
+        if OLD_INDEX in {i['name'] for i in inspector.get_indexes(TABLE)}:
+            batch_op.drop_index(OLD_INDEX)
+        batch_op.create_unique_constraint(CONSTRAINT, ['couple_id', 'page_number'])
+
+
+def downgrade():
+    with op.batch_alter_table(TABLE) as batch_op:
+        batch_op.drop_constraint(CONSTRAINT, type_='unique')
+        batch_op.create_index(OLD_INDEX, ['couple_id', 'page_number'])
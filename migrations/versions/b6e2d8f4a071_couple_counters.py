@@ -0,0 +1,63 @@
+"""couple counters
+
+Revision ID: b6e2d8f4a071
+Revises: a9d3f6c1e274
+Create Date: 2026-10-19 00:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e2d8f4a071'
+down_revision = 'a9d3f6c1e274'
+branch_labels = None
+depends_on = None
+
+
+# counter -> its value computed from the tables (same definitions as counters.actual_counters)
+COUNTERS = {
+    'members_count':
+        "SELECT COUNT(*) FROM users WHERE users.couple_id = couples.id AND users.deletion_requested_at IS NULL",
+    'custom_missions_count':
+        "SELECT COUNT(*) FROM missions WHERE missions.created_by = couples.id",
+    'custom_challenges_count':
+        "SELECT COUNT(*) FROM challenges WHERE challenges.created_by = couples.id",
+    'accepted_missions_count':
+        "SELECT COUNT(*) FROM couples_missions JOIN missions ON missions.id = couples_missions.mission_id "
+        "WHERE couples_missions.couple_id = couples.id",
+    'accepted_challenges_count':
+        "SELECT COUNT(*) FROM couple_challenges JOIN challenges ON challenges.id = couple_challenges.challenges_id "
+        "WHERE couple_challenges.couple_id = couples.id",
+    'accepted_scenarios_count':
+        "SELECT COUNT(*) FROM couples_scenarios JOIN scenarios ON scenarios.id = couples_scenarios.scenario_id "
+        "WHERE couples_scenarios.couple_id = couples.id",
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    # Fresh database: `flask bootstrap` creates the tables from the models
+    if not inspector.has_table('couples'):
+        return
+    existing = {c['name'] for c in inspector.get_columns('couples')}
+    missing = [name for name in COUNTERS if name not in existing]
+    if not missing:
+        return
+
+    with op.batch_alter_table('couples') as batch_op:
+        for name in missing:
+            batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    # Start from the current content, `flask counters-check` verifies them later on
+    op.execute(
+        "UPDATE couples SET " + ", ".join(f"{name} = ({COUNTERS[name]})" for name in missing)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('couples') as batch_op:
+        for name in COUNTERS:
+            batch_op.drop_column(name)
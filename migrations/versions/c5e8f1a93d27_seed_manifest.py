@@ -0,0 +1,34 @@
+"""seed manifest
+
+Revision ID: c5e8f1a93d27
+Revises: 8b41d0e6c2f5
+Create Date: 2026-10-18 19:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8f1a93d27'
+down_revision = '8b41d0e6c2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('seed_manifest'):
+        return
+
+    op.create_table(
+        'seed_manifest',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('seed_manifest')
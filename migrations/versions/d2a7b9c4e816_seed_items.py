@@ -0,0 +1,38 @@
+"""seed items
+
+Revision ID: d2a7b9c4e816
+Revises: c5e8f1a93d27
+Create Date: 2026-10-18 20:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7b9c4e816'
+down_revision = 'c5e8f1a93d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table('seed_items'):
+        return
+
+    op.create_table(
+        'seed_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('item_key', sa.String(length=64), nullable=False),
+        sa.Column('item_hash', sa.String(length=64), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'item_key', name='uq_seed_item'),
+    )
+
+
+def downgrade():
+    op.drop_table('seed_items')
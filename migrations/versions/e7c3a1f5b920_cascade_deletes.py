@@ -0,0 +1,56 @@
+"""cascade deletes
+
+Revision ID: e7c3a1f5b920
+Revises: d2a7b9c4e816
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c3a1f5b920'
+down_revision = 'd2a7b9c4e816'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referred table) of the foreign keys that become ON DELETE CASCADE
+CASCADE_KEYS = [
+    ('story_progress', 'couple_id', 'couples'),
+    ('couples_scenarios', 'couple_id', 'couples'),
+    ('couples_scenarios', 'scenario_id', 'scenarios'),
+    ('missions', 'created_by', 'couples'),
+    ('challenges', 'created_by', 'couples'),
+    ('scenarios', 'created_by', 'users'),
+]
+
+
+def _recreate_keys(ondelete):
+    bind = op.get_bind()
+    # SQLite does not enforce foreign keys here (no PRAGMA foreign_keys), and the
+    # account deletion removes dependent rows explicitly, so only Postgres changes
+    if bind.dialect.name != 'postgresql':
+        return
+    inspector = sa.inspect(bind)
+
+    for table, column, referred in CASCADE_KEYS:
+        # Fresh database: `flask bootstrap` creates the tables from the models
+        if not inspector.has_table(table):
+            continue
+        for key in inspector.get_foreign_keys(table):
+            if key['constrained_columns'] != [column] or key['referred_table'] != referred:
+                continue
+            if (key['options'].get('ondelete') or '').upper() == (ondelete or ''):
+                continue
+            op.drop_constraint(key['name'], table, type_='foreignkey')
+            op.create_foreign_key(key['name'], table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _recreate_keys('CASCADE')
+
+
+def downgrade():
+    _recreate_keys(None)
@@ -0,0 +1,54 @@
+"""erasure jobs
+
+Revision ID: f4b8d2e6a157
+Revises: e7c3a1f5b920
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2e6a157'
+down_revision = 'e7c3a1f5b920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    # Fresh database: `flask bootstrap` creates the tables from the models
+    if inspector.has_table('users') and \
+            'deletion_requested_at' not in {c['name'] for c in inspector.get_columns('users')}:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('deletion_requested_at', sa.DateTime(), nullable=True))
+
+    if not inspector.has_table('erasure_jobs'):
+        op.create_table(
+            'erasure_jobs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('couple_id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('step', sa.String(length=30), nullable=True),
+            sa.Column('rows_deleted', sa.Integer(), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('run_after', sa.DateTime(), nullable=False),
+            sa.Column('lease_until', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('idx_erasure_job_status_run_after', 'erasure_jobs', ['status', 'run_after'])
+        op.create_index('idx_erasure_job_user_id', 'erasure_jobs', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('idx_erasure_job_user_id', table_name='erasure_jobs')
+    op.drop_index('idx_erasure_job_status_run_after', table_name='erasure_jobs')
+    op.drop_table('erasure_jobs')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('deletion_requested_at')
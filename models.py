@@ -33,6 +33,7 @@ class User(db.Model):
 
     points = db.Column(db.Integer, default=0, nullable=False)
     couple_name = db.Column(db.String(30))  # For couple creator
+    deletion_requested_at = db.Column(db.DateTime, nullable=True)  # Set while an ErasureJob purges the account
 
     #nullable keys
 
@@ -66,7 +67,16 @@ class Couple(db.Model):
 
     story_started_at = db.Column(db.DateTime)
     story_current_page = db.Column(db.Integer, default=0)
-    completed_pages = db.relationship('StoryProgress', backref='couple', lazy=True)
+    # The database deletes the progress with the couple (ON DELETE CASCADE)
+    completed_pages = db.relationship('StoryProgress', backref='couple', lazy=True, passive_deletes=True)
+
+    # Counters kept in step with the rows they count (see counters.py), so quotas and the profile read one row
+    members_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Not being deleted
+    custom_missions_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    custom_challenges_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    accepted_missions_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    accepted_challenges_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    accepted_scenarios_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     def __init__(self, couple_name):
         self.invitation_code = str(uuid.uuid4())  # Generate unique code
@@ -76,14 +86,14 @@ class Couple(db.Model):
 class StoryProgress(db.Model):
 
     __table_args__ = (
-    # Composite index for couple_id + page_number queries
-    Index('idx_story_progress_couple_page', 'couple_id', 'page_number'),
+    # A page is completed once per couple (also serves couple_id + page_number queries)
+    db.UniqueConstraint('couple_id', 'page_number', name='uq_story_progress_couple_page'),
     # Index for couple_id queries (to get all progress for a couple)
     Index('idx_story_progress_couple_id', 'couple_id'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
-    couple_id = db.Column(db.Integer, db.ForeignKey('couples.id'), nullable=False)
+    couple_id = db.Column(db.Integer, db.ForeignKey('couples.id', ondelete='CASCADE'), nullable=False)
     page_number = db.Column(db.Integer, nullable=False)
     completed_at = db.Column(db.DateTime, nullable=False)
     fun_level = db.Column(db.Integer)
@@ -99,17 +109,20 @@ class Mission(db.Model):
     Index('idx_mission_created_by', 'created_by'),
     # Index for category filtering
     Index('idx_mission_category', 'category'),
+    # Index for delta sync (rows changed since a cursor)
+    Index('idx_mission_updated_at', 'updated_at'),
     )
 
 
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String(500), nullable=False)
     category = db.Column(db.String(150), nullable=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('couples.id'), nullable=True)  # Null for pre-created
+    created_by = db.Column(db.Integer, db.ForeignKey('couples.id', ondelete='CASCADE'), nullable=True)  # Null for pre-created
     is_precreated = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
     # For pre-created missions: is_precreated=True, created_by=None
-    # For user-created: is_precreated=False, created_by=user.id
+    # For user-created: is_precreated=False, created_by=couple.id
 
 
 # to handle the accepted missions
@@ -117,8 +130,8 @@ class CoupleMission(db.Model):
     __tablename__ = 'couples_missions'
 
     __table_args__ = (
-    # Composite index for couple_id + mission_id queries (checking acceptance)
-    Index('idx_couple_mission_couple_mission', 'couple_id', 'mission_id'),
+    # A couple accepts a mission at most once (also serves couple_id + mission_id lookups)
+    db.UniqueConstraint('couple_id', 'mission_id', name='uq_couple_mission'),
     # Index for couple_id queries (getting all accepted missions)
     Index('idx_couple_mission_couple_id', 'couple_id'),
     # Index for mission_id queries (when deleting missions)
@@ -139,15 +152,17 @@ class Challenges(db.Model):
     Index('idx_challenges_precreated_created_by', 'is_precreated', 'created_by'),
     Index('idx_challenges_created_by', 'created_by'),
     Index('idx_challenges_category', 'category'),
+    Index('idx_challenges_updated_at', 'updated_at'),
     )
 
 
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String(500), nullable=False)
     category = db.Column(db.String(150), nullable=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('couples.id'), nullable=True)  # Null for pre-created
+    created_by = db.Column(db.Integer, db.ForeignKey('couples.id', ondelete='CASCADE'), nullable=True)  # Null for pre-created
     is_precreated = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
 
 
 
@@ -157,7 +172,7 @@ class CoupleChallenges(db.Model):
 
     __table_args__ = (
     # Similar indexes as CoupleMission
-    Index('idx_couple_challenges_couple_challenge', 'couple_id', 'challenges_id'),
+    db.UniqueConstraint('couple_id', 'challenges_id', name='uq_couple_challenges'),
     Index('idx_couple_challenges_couple_id', 'couple_id'),
     Index('idx_couple_challenges_challenge_id', 'challenges_id'),
     )
@@ -175,6 +190,7 @@ class Scenario(db.Model):
     Index('idx_scenario_created_by', 'created_by'),
     # Index for precreated filtering
     Index('idx_scenario_precreated', 'is_precreated'),
+    Index('idx_scenario_updated_at', 'updated_at'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -183,8 +199,9 @@ class Scenario(db.Model):
     prompt = db.Column(db.String(500), nullable=False)
     time = db.Column(db.String(50))  # Flexible time format (e.g., "8:00 PM")
     is_precreated = db.Column(db.Boolean, default=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
 
 
 class CoupleScenario(db.Model):
@@ -192,17 +209,81 @@ class CoupleScenario(db.Model):
 
     __table_args__ = (
     # Similar indexes as other couple association tables
-    Index('idx_couple_scenario_couple_scenario', 'couple_id', 'scenario_id'),
+    db.UniqueConstraint('couple_id', 'scenario_id', name='uq_couple_scenario'),
     Index('idx_couple_scenario_couple_id', 'couple_id'),
     Index('idx_couple_scenario_scenario_id', 'scenario_id'),
     )
 
     
     id = db.Column(db.Integer, primary_key=True)
-    couple_id = db.Column(db.Integer, db.ForeignKey('couples.id'), nullable=False)
-    scenario_id = db.Column(db.Integer, db.ForeignKey('scenarios.id'), nullable=False)
+    couple_id = db.Column(db.Integer, db.ForeignKey('couples.id', ondelete='CASCADE'), nullable=False)
+    scenario_id = db.Column(db.Integer, db.ForeignKey('scenarios.id', ondelete='CASCADE'), nullable=False)
     accepted_at = db.Column(db.DateTime, default=datetime.now)
 
 
+# deletions, so the delta sync can tell clients what disappeared
+class SyncTombstone(db.Model):
+    __tablename__ = 'sync_tombstones'
+
+    __table_args__ = (
+    # Index for "deleted since cursor" queries
+    Index('idx_sync_tombstone_deleted_at', 'deleted_at'),
+    Index('idx_sync_tombstone_couple_id', 'couple_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # 'missions', 'challenges', 'scenarios' for content,
+    # 'accepted_missions', 'accepted_challenges', 'accepted_scenarios' for acceptances
+    kind = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    couple_id = db.Column(db.Integer, nullable=True)  # Null for precreated content (visible to everyone)
+    deleted_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
 
 
+# digests of the seed files, so unchanged seeds are not re-processed
+class SeedManifest(db.Model):
+    __tablename__ = 'seed_manifest'
+
+    name = db.Column(db.String(50), primary_key=True)
+    digest = db.Column(db.String(64), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+# one row per seed item: hash of its identifying field -> hash of its content and the row it seeded
+class SeedItem(db.Model):
+    __tablename__ = 'seed_items'
+
+    __table_args__ = (
+    db.UniqueConstraint('kind', 'item_key', name='uq_seed_item'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # 'missions', 'challenges', 'scenarios'
+    item_key = db.Column(db.String(64), nullable=False)
+    item_hash = db.Column(db.String(64), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+
+
+# account deletions, purged in the background (see erasure.py)
+class ErasureJob(db.Model):
+    __tablename__ = 'erasure_jobs'
+
+    __table_args__ = (
+    # Index for "jobs due to run" queries
+    Index('idx_erasure_job_status_run_after', 'status', 'run_after'),
+    Index('idx_erasure_job_user_id', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # No foreign key, the job deletes the user
+    couple_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'running', 'done', 'failed'
+    step = db.Column(db.String(30))  # Purge step of the last committed batch
+    rows_deleted = db.Column(db.Integer, default=0, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    run_after = db.Column(db.DateTime, default=datetime.now, nullable=False)  # Retries wait (backoff)
+    lease_until = db.Column(db.DateTime)  # A running job whose lease expired is picked up again
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+    finished_at = db.Column(db.DateTime)
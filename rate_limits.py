@@ -0,0 +1,187 @@
+"""
+Request rate limiting, keyed by user when authenticated and by IP otherwise.
+
+Every request is checked against one set of limits: the ones of its route
+(rate_limit decorator) or the default ones. With Redis the whole set is
+evaluated by a single Lua script call, using fixed windows and the same keys
+as Flask-Limiter's Redis storage. In front of it:
+
+- an in-process token bucket rejects obvious floods without a round trip
+  (it is sized so it never rejects what the Redis windows would allow)
+- a circuit breaker lets requests through (fail open) for a while after
+  Redis failed or timed out a few times in a row
+
+Without Redis the windows are kept in process memory.
+"""
+import logging
+import threading
+import time
+from functools import wraps
+import redis
+from cachetools import TTLCache
+from flask import request, current_app, abort
+from flask_jwt_extended import get_jwt_identity
+from flask_limiter.util import get_remote_address
+from limits import parse_many
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'LIMITS'        # namespace of Flask-Limiter's Redis storage, so counters carry over
+BREAKER_THRESHOLD = 3        # consecutive Redis failures before failing open
+BREAKER_COOLDOWN = 30        # seconds before Redis is tried again
+LOCAL_BUCKETS = 10000        # (client, limit) pairs tracked by the pre-filter
+LOCAL_BUCKET_TTL = 3600      # forgetting a bucket only makes the pre-filter more permissive
+
+# KEYS: one fixed-window counter per limit, ARGV: (amount, window seconds) per limit.
+# Returns the 1-based index of the first exceeded limit, 0 when all of them pass.
+HIT_SCRIPT = """
+local exceeded = 0
+for i, key in ipairs(KEYS) do
+    local amount = tonumber(ARGV[i * 2 - 1])
+    local current = redis.call('INCR', key)
+    if current == 1 then
+        redis.call('EXPIRE', key, ARGV[i * 2])
+    end
+    if current > amount and exceeded == 0 then
+        exceeded = i
+    end
+end
+return exceeded
+"""
+
+
+def get_user_id():
+    """Custom key function for rate limiting based on user_id"""
+    try:
+        user_id = get_jwt_identity()
+        if user_id:
+            return f"user:{user_id}"
+        else:
+            return f"ip:{get_remote_address()}"
+    except:
+        return f"ip:{get_remote_address()}"
+
+
+class RateLimiter:
+    """Fixed-window rate limiter evaluating all the limits of a request in one Redis call"""
+
+    def __init__(self, key_func, default_limits=()):
+        self.key_func = key_func
+        self.default_limits = [item for limit in default_limits for item in parse_many(limit)]
+        self.enabled = True
+        self.prefilter = True
+        self._limited_views = set()
+        self._redis = None
+        self._script = None
+        self._memory = FixedWindowRateLimiter(MemoryStorage())
+        self._buckets = TTLCache(maxsize=LOCAL_BUCKETS, ttl=LOCAL_BUCKET_TTL)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        self.prefilter = app.config.get('RATELIMIT_LOCAL_PREFILTER', True)
+        storage_url = app.config.get('RATELIMIT_STORAGE_URL')
+        if storage_url:
+            # Short timeouts: a slow Redis trips the breaker instead of stalling requests
+            timeout = app.config.get('RATELIMIT_REDIS_TIMEOUT', 0.1)
+            self._redis = redis.from_url(storage_url, socket_timeout=timeout, socket_connect_timeout=timeout)
+            self._script = self._redis.register_script(HIT_SCRIPT)
+        app.before_request(self._check_default_limits)
+
+    def limit(self, limit_string):
+        """Decorator applying limits to a route instead of the default ones"""
+        items = parse_many(limit_string)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                # Checked here rather than before the request so the key sees the JWT identity
+                self.check(items)
+                return f(*args, **kwargs)
+            self._limited_views.add(f"{f.__module__}.{f.__qualname__}")
+            return decorated_function
+        return decorator
+
+    def _check_default_limits(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or f"{view.__module__}.{view.__qualname__}" in self._limited_views:
+            return
+        self.check(self.default_limits)
+
+    def check(self, items):
+        """Count the current request against limits, abort with 429 when one is exceeded"""
+        if not self.enabled or not items:
+            return
+        key, scope = self.key_func(), request.endpoint
+        exceeded = self.hit(key, scope, items)
+        if exceeded is not None:
+            logger.info(f"ratelimit {exceeded} ({key}) exceeded at endpoint: {scope}")
+            abort(429, description=str(exceeded))
+
+    def hit(self, key, scope, items):
+        """Count one hit against every limit, returns the first exceeded limit or None"""
+        if self.prefilter:
+            exceeded = self._take_local(key, scope, items)
+            if exceeded is not None:
+                return exceeded
+
+        if self._redis is None:
+            for item in items:
+                if not self._memory.hit(item, key, scope):
+                    return item
+            return None
+
+        if time.monotonic() < self._open_until:
+            return None
+        try:
+            index = self._script(
+                keys=[f"{KEY_PREFIX}:{item.key_for(key, scope)}" for item in items],
+                args=[value for item in items for value in (item.amount, item.get_expiry())]
+            )
+        except redis.RedisError as e:
+            self._record_failure(e)
+            return None
+        self._failures = 0
+        return items[index - 1] if index else None
+
+    def _take_local(self, key, scope, items):
+        # Buckets hold 2x the limit and refill at its rate: a fixed window lets at most
+        # that much through around a window boundary, so only real floods are rejected.
+        now = time.monotonic()
+        with self._lock:
+            for item in items:
+                bucket_key = item.key_for(key, scope)
+                capacity = 2 * item.amount
+                tokens, updated = self._buckets.get(bucket_key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * item.amount / item.get_expiry())
+                if tokens < 1:
+                    self._buckets[bucket_key] = (tokens, now)
+                    return item
+                self._buckets[bucket_key] = (tokens - 1, now)
+        return None
+
+    def _record_failure(self, error):
+        with self._lock:
+            self._failures += 1
+            if self._failures < BREAKER_THRESHOLD:
+                return
+            self._open_until = time.monotonic() + BREAKER_COOLDOWN
+            # After the cooldown a single failure opens the breaker again
+            self._failures = BREAKER_THRESHOLD - 1
+        logger.warning(f"Rate limit storage unavailable, failing open for {BREAKER_COOLDOWN}s: {error}")
+
+
+# Initialize limiter
+limiter = RateLimiter(
+    key_func=get_user_id,
+    default_limits=["3000 per hour"]
+)
+
+
+def rate_limit(limit_string):
+    """Decorator to apply rate limits to routes"""
+    return limiter.limit(limit_string)
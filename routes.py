@@ -1,15 +1,29 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g, make_response
 from models import db, User, Couple, Mission, CoupleMission, CoupleChallenges, Scenario, Challenges, CoupleScenario, StoryProgress, bcrypt
-import re  
-from flask_jwt_extended import create_access_token, create_refresh_token
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from google_certs import verify_google_id_token
 import os
 from functools import wraps
 import logging
-from flask_limiter import Limiter
+import bisect
+import heapq
+from itertools import islice
+from operator import itemgetter
+from rate_limits import rate_limit
+from validation import json_schema, Field
+from validation import validate_text_input, validate_name, validate_content, validate_comments, validate_id_int, validate_id_list
+from validation import validate_flag, validate_string, validate_token, validate_invitation_code, validate_couple_name
+from sqlalchemy import select, delete, and_, func
+from sqlalchemy.orm import joinedload, aliased
+from catalog_cache import CATALOG_KINDS, get_precreated, encode_catalog
+from catalog_cache import catalog_etag, bump_couple_version
+from db_helpers import insert_if_absent, insert_many_if_absent
+from sync import ACCEPTANCE_KINDS, record_tombstones, parse_cursor, build_sync
+from tokens import create_user_tokens, create_user_access_token, revoke_user_tokens
+from erasure import request_erasure
+from story import write_progress
+from counters import MAX_COUPLE_MEMBERS, MAX_CUSTOM_ITEMS, adjust_counters, take_slot, uncount_acceptances
 
 
 api = Blueprint('api', __name__)
@@ -41,122 +55,136 @@ def validate_request_size(max_size_mb=1):
         return decorated_function
     return decorator
 
-def validate_json_structure():
-    """Ensure JSON is properly structured"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            if not request.is_json:
-
-                return jsonify({'error': 'Content-Type must be application/json'}), 400
-            
-            try:
-                data = request.get_json()
-                if data is None:
-                    return jsonify({'error': 'Invalid JSON'}), 400
-            except Exception:
-                return jsonify({'error': 'Malformed JSON'}), 400
-            
-            return f(*args, **kwargs)
-        return decorated_function
-    return decorator
-
-def validate_text_input(text, field_name, max_length=500, min_length=1):
+def current_user():
     """
-    Validate and sanitize text input to prevent injection attacks
+    Authenticated user, loaded once per request together with its couple (single joined query).
+    Returns None when the user no longer exists or is being deleted.
     """
-    if text is None or not isinstance(text, str):
-        return None, f"{field_name} is required and must be text"
-    
-    # Strip whitespace
-    text = text.strip()
-    
-    # Check length
-    if len(text) < min_length:
-        return None, f"{field_name} is too short"
-    if len(text) > max_length:
-        return None, f"{field_name} is too long (max {max_length} characters)"
-    
-    # Check for potentially dangerous patterns
-    dangerous_patterns = [
-        r'<script[^>]*>.*?</script>',  # Script tags
-        r'javascript:',               # JavaScript protocol
-        r'on\w+\s*=',                # Event handlers
-        r'<iframe[^>]*>',            # Iframes
-        r'<object[^>]*>',            # Objects
-        r'<embed[^>]*>',             # Embeds
-        r'eval\s*\(',                # eval() calls
-        r'Function\s*\(',            # Function constructor
-    ]
-    
-    for pattern in dangerous_patterns:
-        if re.search(pattern, text, re.IGNORECASE):
-            return None, f"{field_name} contains potentially unsafe content"
-    
-    # Additional check for excessive special characters
-    special_char_count = len(re.findall(r'[<>{}[\]\\`]', text))
-    if special_char_count > len(text) * 0.1:  # More than 10% special chars
-        return None, f"{field_name} contains too many special characters"
-    
-    return text, None
+    if 'current_user' not in g:
+        user = db.session.get(User, int(get_jwt_identity()), options=[joinedload(User.couple)])
+        # An account waiting for its erasure job is already gone for the API
+        g.current_user = user if user is None or user.deletion_requested_at is None else None
+    return g.current_user
 
-def validate_name(name):
-    """Specific validation for names"""
-    name, error = validate_text_input(name, "Name", max_length=30, min_length=1)
-    if error:
-        return None, error
-    
-    # Names should be mostly letters, spaces, hyphens, apostrophes
-    if not re.match(r"^[a-zA-Z\s\-'\.]+$", name):
-        return None, "Name contains invalid characters"
-    
-    return name, None
-
-def validate_content(content, content_type="Content"):
-    """Validate mission/challenge content"""
-    return validate_text_input(content, content_type, max_length=300, min_length=5)
-
-def validate_comments(comments):
-    """Validate user comments"""
-    if not comments:  # Comments are optional
-        return "", None
-    return validate_text_input(comments, "Comments", max_length=300, min_length=1)
-
-def validate_id_int(id, field_name):
-    """validate the id, when supposed to be a single integer"""
-    if id is None or not isinstance(id, int):
-        return None, f"{field_name} is required and must be integer"
-    if len(str(id)) > 5:
-        return None, f"{field_name} is too long"
-    
-    return id, None
+def current_couple_id():
+    """
+    couple_id of the authenticated user.
+    Taken from the 'couple_id' JWT claim when the token carries one, so no query is needed,
+    otherwise from current_user().
+    """
+    couple_id = get_jwt().get('couple_id')
+    if couple_id is not None:
+        return couple_id
+    user = current_user()
+    return user.couple_id if user else None
 
-def get_limiter():
-    if 'limiter' not in current_app.extensions:
-        return None
-    limiter_ext = current_app.extensions['limiter']
-    
-    if isinstance(limiter_ext, dict) and limiter_ext:
-        return next(iter(limiter_ext.values()))
-    elif isinstance(limiter_ext, set) and limiter_ext:
-        return next(iter(limiter_ext))
-    return None
-
-def rate_limit(limit_string):
-    """Decorator to apply rate limits to routes"""
+def couple_member_required(f):
+    """
+    Reject requests whose <couple_id> path parameter is not the user's couple.
+    Uses the couple_id JWT claim, so no query is made for tokens that carry it.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_couple_id() != kwargs.get('couple_id'):
+            return jsonify({'error': 'Unauthorized'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def conditional_catalog(kind):
+    """Answer 304 Not Modified when the couple's listing of a catalog kind did not change"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            limiter = get_limiter()
-            if limiter:
-                # Create a new decorated function with the rate limit applied
-                limited_function = limiter.limit(limit_string)(f)
-                return limited_function(*args, **kwargs)
-            return f(*args, **kwargs)
+            couple_id = current_couple_id()
+            # Computed before the view runs: a concurrent write can only make the ETag stale, never wrong
+            etag = catalog_etag(couple_id, kind, request.query_string.decode()) if couple_id else None
+            if etag is None:
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
         return decorated_function
     return decorator
 
 
+MAX_PAGE_SIZE = 200
+
+def parse_page_args(allow_category=True):
+    """Read the optional ?category=, ?after_id= and ?limit= listing arguments"""
+    page = {'category': None, 'after_id': None, 'limit': None}
+
+    category = request.args.get('category')
+    if category is not None:
+        if not allow_category:
+            return None, "category filter is not supported here"
+        page['category'], error = validate_text_input(category, "Category", max_length=150, min_length=1)
+        if error:
+            return None, error
+
+    values, error = parse_int_args(('after_id', 0), ('limit', 1))
+    if error:
+        return None, error
+    page.update(values)
+    return page, None
+
+def parse_int_args(*specs):
+    """Read optional integer query arguments given as (name, minimum), a limit is capped at MAX_PAGE_SIZE"""
+    values = {}
+    for name, minimum in specs:
+        values[name] = None
+        if request.args.get(name) is None:
+            continue
+        value = request.args.get(name, type=int)
+        if value is None or value < minimum:
+            return None, f"{name} must be an integer >= {minimum}"
+        values[name] = min(value, MAX_PAGE_SIZE) if name == 'limit' else value
+    return values, None
+
+def list_catalog(kind, custom_query, page):
+    """
+    Keyset-paginated listing of a kind ordered by id: the cached precreated entries
+    merged with the couple's custom rows (custom_query). Returns (entries, next_after_id),
+    the entries without the couple's 'accepted' flag (added by catalog_response).
+    """
+    model, serializer = CATALOG_KINDS[kind]
+    category, after_id, limit = page['category'], page['after_id'], page['limit']
+
+    precreated = get_precreated(kind, category)
+    if category is not None:
+        custom_query = custom_query.filter(model.category == category)
+    if after_id is not None:
+        precreated = precreated[bisect.bisect_right(precreated, after_id, key=itemgetter('id')):]
+        custom_query = custom_query.filter(model.id > after_id)
+    custom_query = custom_query.order_by(model.id)
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        custom_query = custom_query.limit(limit + 1)
+
+    merged = heapq.merge(precreated, (serializer(row) for row in custom_query), key=itemgetter('id'))
+    if limit is None:
+        return list(merged), None
+
+    items = list(islice(merged, limit + 1))
+    next_after_id = items[limit - 1]['id'] if len(items) > limit else None
+    return items[:limit], next_after_id
+
+def catalog_response(kind, entries, accepted_ids, next_after_id):
+    """JSON list response, with the next page cursor in the X-Next-Cursor header"""
+    body = encode_catalog(kind, entries, accepted_ids) + b'\n'
+    response = current_app.response_class(body, status=200, mimetype=current_app.json.mimetype)
+    if next_after_id is not None:
+        response.headers['X-Next-Cursor'] = str(next_after_id)
+    return response
+
+
 # ------------------------------------------------
 # ------------------------------------------------
 # ------------------------------------------------
@@ -164,15 +192,19 @@ def rate_limit(limit_string):
 
 @api.route('/auth/google/register', methods=['POST'])
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(
+    token=Field(validate_token),
+    name=Field(validate_name),
+    invitation_code=Field(validate_invitation_code, optional=True),
+    # Only checked when it names a new couple (see below), ignored with an invitation code
+    couple_name=Field(validate_string, "Couple name", optional=True),
+    accepted_terms=Field(validate_flag, "Accepted terms", optional=True),
+)
 @rate_limit("30 per minute")  # 30 mission acceptances per minute per user
-def google_register():
-    data = request.get_json()
-    id_token_str = data.get('token')
-    
+def google_register(token, name, invitation_code, couple_name, accepted_terms):
     # Verify token first
     try:
-        idinfo = id_token.verify_oauth2_token(id_token_str, requests.Request(), CLIENT_ID)
+        idinfo = verify_google_id_token(token, CLIENT_ID)
         if idinfo['aud'] != CLIENT_ID:
             return jsonify({'error': 'Invalid token'}), 401
         email = idinfo['email']
@@ -183,24 +215,6 @@ def google_register():
     if User.query.filter_by(username=email).first():
         return jsonify({'error': 'User already exists'}), 409
 
-    # Extract fields
-    invitation_code = data.get('invitation_code', '').strip()
-    if invitation_code:
-        if len(invitation_code) > 40 or len(invitation_code) < 10:
-            return jsonify({'error': 'Invalid invitation code'}, 408)
-        
-    name = data.get('name', '')
-    name, error = validate_name(name)
-    if error:
-        return jsonify({'error': error}), 400
-    
-    accepted_terms = data.get('accepted_terms', False)
-
-    if len(name) > 30:
-        return jsonify({'error': 'Name too long'}), 400
-
-
-    
     # Validate common fields
     if not all([name, accepted_terms]):
         return jsonify({'error': 'Missing name or terms acceptance'}), 403
@@ -211,7 +225,9 @@ def google_register():
         if not couple:
             return jsonify({'error': 'Invalid invitation code'}), 404
             
-        if len(couple.users) >= 2:
+        # Takes the seat in this transaction, a failed registration gives it back.
+        # The code is checked again on the locked row: erasing the last member rotates it.
+        if not take_slot(couple.id, 'members_count', MAX_COUPLE_MEMBERS, Couple.invitation_code == invitation_code):
             return jsonify({'error': 'Couple is full'}), 405
         
         couple_id = couple.id
@@ -219,21 +235,18 @@ def google_register():
         
     # Handle new couple case
     else:
-        couple_name = data.get('couple_name', '')
         if not couple_name:
             return jsonify({'error': 'Couple name required for new couples'}), 406
-            
+
         if len(couple_name) > 30:
             return jsonify({'error': 'Couple name too long'}), 407
-        
-        validated_couple_name, error = validate_name(couple_name)
+
+        couple_name, error = validate_couple_name(couple_name)
         if error:
-            return jsonify({'error': f"Couple {error.lower()}"}), 400
-        
-        couple_name = validated_couple_name
-    
-            
+            return jsonify({'error': error}), 400
+
         new_couple = Couple(couple_name=couple_name)
+        new_couple.members_count = 1
         db.session.add(new_couple)
         db.session.flush()
         couple_id = new_couple.id
@@ -253,8 +266,7 @@ def google_register():
         return jsonify({'error': str(e)}), 500
 
     # Generate tokens
-    access_token = create_access_token(identity=str(new_user.id))
-    refresh_token = create_refresh_token(identity=str(new_user.id))
+    access_token, refresh_token = create_user_tokens(new_user.id, couple_id)
 
     return jsonify({
         'access_token': access_token,
@@ -266,12 +278,11 @@ def google_register():
 
 @api.route('/auth/google/login', methods=['POST'])
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(token=Field(validate_token))
 @rate_limit("30 per minute")
-def google_login():
-    id_token_str = request.get_json().get('token')
+def google_login(token):
     try:
-        idinfo = id_token.verify_oauth2_token(id_token_str, requests.Request(), CLIENT_ID)
+        idinfo = verify_google_id_token(token, CLIENT_ID)
         email = idinfo['email']
     except ValueError:
         return jsonify({'error': 'Invalid token'}), 401
@@ -279,9 +290,10 @@ def google_login():
     user = User.query.filter_by(username=email).first()
     if not user:
         return jsonify({'error': 'User not registered'}), 404
+    if user.deletion_requested_at:
+        return jsonify({'error': 'Account is being deleted'}), 410
 
-    access_token = create_access_token(identity=str(user.id))
-    refresh_token = create_refresh_token(identity=str(user.id))
+    access_token, refresh_token = create_user_tokens(user.id, user.couple_id)
     return jsonify({
         'access_token': access_token,
         'refresh_token': refresh_token,
@@ -295,64 +307,18 @@ def google_login():
 @rate_limit("5 per minute")
 def delete_user():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        couple = Couple.query.get(user.couple_id)
-    
-        # Get all user-created content first
-        user_missions = Mission.query.filter_by(created_by=user.id).all()
-        
-        user_challenges = Challenges.query.filter_by(created_by=user.id).all()
-        
-        user_scenarios = Scenario.query.filter_by(created_by=user.id).all()
-        
-        # Delete dependent records first
-        # 1. Handle Missions
-        for mission in user_missions:
-            # Delete from couples_missions first
-            CoupleMission.query.filter_by(mission_id=mission.id).delete()
-            db.session.delete(mission)
-        
-        # 2. Handle Challenges  
-        for challenge in user_challenges:
-            # Delete from couple_challenges first
-            CoupleChallenges.query.filter_by(challenges_id=challenge.id).delete()
-            db.session.delete(challenge)
-        
-        # 3. Handle Scenarios
-        for scenario in user_scenarios:
-            # Delete from couples_scenarios first
-            CoupleScenario.query.filter_by(scenario_id=scenario.id).delete()
-            db.session.delete(scenario)
-        
-        # Check remaining users BEFORE deleting current user
-        remaining_users_count = User.query.filter_by(couple_id=couple.id).filter(User.id != user.id).count()
-        
-        # Delete the user
-        db.session.delete(user)
-        
-        # If this was the last user in the couple, delete the couple and related data
-        if remaining_users_count == 0:
-            
-            # Delete all couple's accepted content (regardless of who created it)
-            CoupleMission.query.filter_by(couple_id=couple.id).delete()
-            CoupleChallenges.query.filter_by(couple_id=couple.id).delete() 
-            CoupleScenario.query.filter_by(couple_id=couple.id).delete()
-            
-            # Delete story progress
-            StoryProgress.query.filter_by(couple_id=couple.id).delete()
-            
-            # Finally delete the couple
-            db.session.delete(couple)
-        
-        # Commit all changes
+        # The account is unusable from now on, its data is purged in the background (erasure.py)
+        request_erasure(user.id, user.couple_id)
         db.session.commit()
+        # The couple_id claim of this user's access tokens is no longer valid
+        revoke_user_tokens(user.id)
         
-        return jsonify({'message': 'Account deleted successfully'}), 200
+        return jsonify({'message': 'Account deletion scheduled'}), 202
         
     except Exception as e:
         db.session.rollback()
@@ -365,24 +331,38 @@ def delete_user():
 @rate_limit("15 per minute")
 def get_couple_details():
     try:
-  
-        user_id = get_jwt_identity()
-        
-        user = User.query.get(user_id)
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        couple = Couple.query.get(user.couple_id)
+        couple = user.couple
         if not couple:
             return jsonify({'error': 'Couple not found'}), 404
-        
+
+        # The couple row came with the user, the members' names are only queried when there is a partner
+        if couple.members_count > 1:
+            names = db.session.scalars(
+                select(User.name)
+                .where(User.couple_id == couple.id, User.deletion_requested_at.is_(None))
+                .order_by(User.id)
+            ).all()
+        else:
+            names = [user.name]
 
         return jsonify({
             'couple_name': couple.couple_name,
             'level': couple.level,
             'points': couple.points,
             'invitation_code': couple.invitation_code,
-            'users': [user.name for user in couple.users]
+            'users': names,
+            'counts': {
+                'members': couple.members_count,
+                'custom_missions': couple.custom_missions_count,
+                'custom_challenges': couple.custom_challenges_count,
+                'accepted_missions': couple.accepted_missions_count,
+                'accepted_challenges': couple.accepted_challenges_count,
+                'accepted_scenarios': couple.accepted_scenarios_count,
+            }
         }), 200
 
     except Exception as e:
@@ -394,13 +374,15 @@ def get_couple_details():
 @api.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)  # This validates the refresh token
 @validate_request_size(max_size_mb=3)
-#@validate_json_structure()
 @rate_limit("30 per minute")
 def refresh():
     try:
-        current_user = get_jwt_identity()
+        # Re-read the couple so the couple_id claim is always current
+        user = db.session.get(User, int(get_jwt_identity()))
+        if not user or user.deletion_requested_at:
+            return jsonify({'error': 'User not found'}), 401
         return jsonify({
-            'access_token': create_access_token(identity=current_user)
+            'access_token': create_user_access_token(user.id, user.couple_id)
         }), 200
     except Exception as e:
         # Specific error for expired refresh token
@@ -413,71 +395,54 @@ def refresh():
 @api.route('/missions', methods=['GET'])
 @jwt_required()
 @rate_limit("15 per minute")
+@conditional_catalog('missions')
 def get_missions():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    couple_id = user.couple_id
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
 
-    missions = Mission.query.filter((Mission.is_precreated == True) | (Mission.created_by == couple_id)).all()
+    page, error = parse_page_args()
+    if error:
+        return jsonify({'error': error}), 400
 
     # Check acceptance
-    accepted_mission_ids = {cm.mission_id for cm in CoupleMission.query.filter_by(couple_id=couple_id)}
-
-    result = []
-    for mission in missions:
-        result.append({
-            'id': mission.id,
-            'content': mission.content,
-            'category': mission.category,
-            'is_precreated': mission.is_precreated,
-            'created_by': mission.created_by,
-            'accepted': mission.id in accepted_mission_ids
-        })
+    accepted_mission_ids = {mission_id for (mission_id,) in db.session.query(CoupleMission.mission_id).filter_by(couple_id=couple_id)}
+
+    # Precreated missions come from the in-process cache, only the couple's own ones are queried
+    custom = Mission.query.filter(Mission.created_by == couple_id, Mission.is_precreated == False)
+    result, next_after_id = list_catalog('missions', custom, page)
     
-    return jsonify(result), 200
+    return catalog_response('missions', result, accepted_mission_ids, next_after_id)
 
 
 @api.route('/missions', methods=['POST'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(
+    content=Field(validate_content, "Mission content"),
+    category=Field(validate_text_input, "Category", max_length=150, min_length=1),
+)
 @rate_limit("10 per hour")
-def create_mission():
-    data = request.get_json()
-
-    content = data.get('content', '')
-    validated_content, error = validate_content(content, "Mission content")
-    if error:
-        return jsonify({'error': error}), 400
-    
-    category = data.get('category', '')
-    validated_category, error = validate_text_input(category, "Category", max_length=150, min_length=1)
-    if error:
-        return jsonify({'error': error}), 400
-    
-
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    couple_id = user.couple_id
+def create_mission(content, category):
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
 
-    # Query the database to count missions created by this couple
-    existing_mission_count = Mission.query.filter_by(created_by=couple_id).count()
-
-
-    # Check if the count is more than 5
-    if existing_mission_count > 5:
-        return jsonify({'error': 'Forbidden - Maximum number of missions created (5) exceeded'}), 403
+    # Counted on the couple row, the slot is given back if the insert fails
+    if not take_slot(couple_id, 'custom_missions_count', MAX_CUSTOM_ITEMS):
+        return jsonify({'error': f'Forbidden - Maximum number of missions created ({MAX_CUSTOM_ITEMS}) exceeded'}), 403
 
     # Proceed to create the new mission
     new_mission = Mission(
-        content=validated_content,
-        category=validated_category,
+        content=content,
+        category=category,
         created_by=couple_id,
         is_precreated=False
     )
 
     db.session.add(new_mission)
     db.session.commit()
+    bump_couple_version(couple_id, 'missions', 'custom')
 
     return jsonify({
         'id': new_mission.id,
@@ -492,64 +457,36 @@ def create_mission():
 @api.route('/couples/<int:couple_id>/missions', methods=['POST'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(mission_id=Field(validate_id_int, "mission id"))
 @rate_limit("30 per minute")
-def accept_mission(couple_id):
-    data = request.get_json()
-    mission_id = data['mission_id']
-
-    mission_id, error = validate_id_int(mission_id, "mission id")
-    if error:
-        return jsonify({'error': error}), 400
-
-    # Verify user belongs to the couple
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.couple_id != couple_id:
-        return jsonify({'error': 'Unauthorized'}), 403
-
+@couple_member_required
+def accept_mission(couple_id, mission_id):
     try:
-        # Check if already exists
-        existing = CoupleMission.query.filter_by(
-            couple_id=couple_id, 
-            mission_id=mission_id
-        ).first()
-        
-        if existing:
-            print(f"Mission {mission_id} already accepted by couple {couple_id}")
-            return jsonify({'message': 'Mission already accepted'}), 200
-
-        new_entry = CoupleMission(couple_id=couple_id, mission_id=mission_id)
-        db.session.add(new_entry)
+        # Single idempotent statement, tells us whether the row is new
+        created = insert_if_absent(CoupleMission, ['couple_id', 'mission_id'], couple_id=couple_id, mission_id=mission_id)
+        if created:
+            adjust_counters(couple_id, accepted_missions_count=1)
         db.session.commit()
-        
-        # Verify it was actually saved
-        verification = CoupleMission.query.filter_by(
-            couple_id=couple_id, 
-            mission_id=mission_id
-        ).first()
-        
-        if verification:
-            print(f"✅ Successfully saved mission {mission_id} for couple {couple_id}")
-        else:
-            print(f"❌ Failed to save mission {mission_id} for couple {couple_id}")
-            
-        return jsonify({'message': 'Mission accepted'}), 201
-        
     except Exception as e:
         db.session.rollback()
         print(f"Error accepting mission: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+    if not created:
+        return jsonify({'message': 'Mission already accepted'}), 200
+
+    bump_couple_version(couple_id, 'missions', 'accepted')
+    return jsonify({'message': 'Mission accepted'}), 201
+
 
 @api.route('/missions/<int:mission_id>', methods=['DELETE'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
 @rate_limit("20 per minute")
 def delete_mission(mission_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    couple_id = user.couple_id
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
 
     mission = Mission.query.get(mission_id)
     if not mission:
@@ -559,8 +496,13 @@ def delete_mission(mission_id):
     if mission.created_by != couple_id:
         return jsonify({'error': 'Unauthorized'}), 403
 
+    # Couples that accepted the mission lose it (the acceptances cascade in the database)
+    uncount_acceptances('missions', CoupleMission.mission_id == mission_id)
+    adjust_counters(couple_id, custom_missions_count=-1)
     db.session.delete(mission)
+    record_tombstones('missions', [mission_id], couple_id)
     db.session.commit()
+    bump_couple_version(couple_id, 'missions', 'custom')
     return jsonify({'message': 'Challenge deleted'}), 200
 
 
@@ -569,12 +511,8 @@ def delete_mission(mission_id):
 @jwt_required()
 @validate_request_size(max_size_mb=3)
 @rate_limit("30 per minute")
+@couple_member_required
 def unlike_mission(couple_id, mission_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.couple_id != couple_id:
-        return jsonify({'error': 'Unauthorized'}), 403
-
     entry = CoupleMission.query.filter_by(
         couple_id=couple_id, 
         mission_id=mission_id
@@ -584,7 +522,10 @@ def unlike_mission(couple_id, mission_id):
         return jsonify({'error': 'Entry not found'}), 404
 
     db.session.delete(entry)
+    adjust_counters(couple_id, accepted_missions_count=-1)
+    record_tombstones('accepted_missions', [mission_id], couple_id)
     db.session.commit()
+    bump_couple_version(couple_id, 'missions', 'accepted')
     return jsonify({'message': 'Challenge unliked'}), 200
 
 # challenges section
@@ -592,73 +533,54 @@ def unlike_mission(couple_id, mission_id):
 @api.route('/challenges', methods=['GET'])
 @jwt_required()
 @rate_limit("10 per minute")
+@conditional_catalog('challenges')
 def get_challenges():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    couple_id = user.couple_id
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
 
-    # Fetch all challenges
-    challenges = Challenges.query.filter((Challenges.is_precreated == True) | (Challenges.created_by == couple_id)).all()
+    page, error = parse_page_args()
+    if error:
+        return jsonify({'error': error}), 400
 
     # Check acceptance
-    accepted_challenges_ids = {cm.challenges_id for cm in CoupleChallenges.query.filter_by(couple_id=couple_id)}
-
-    result = []
-    for challenges in challenges:
-        result.append({
-            'id': challenges.id,
-            'content': challenges.content,
-            'category': challenges.category,
-            'is_precreated': challenges.is_precreated,
-            'created_by': challenges.created_by,
-            'accepted': challenges.id in accepted_challenges_ids
-        })
+    accepted_challenges_ids = {challenges_id for (challenges_id,) in db.session.query(CoupleChallenges.challenges_id).filter_by(couple_id=couple_id)}
+
+    # Precreated challenges come from the in-process cache, only the couple's own ones are queried
+    custom = Challenges.query.filter(Challenges.created_by == couple_id, Challenges.is_precreated == False)
+    result, next_after_id = list_catalog('challenges', custom, page)
 
     print(f"Fetched {len(result)} challenges for couple {couple_id}")
-    print(challenges)
     
-    return jsonify(result), 200
+    return catalog_response('challenges', result, accepted_challenges_ids, next_after_id)
 
 
 @api.route('/challenges', methods=['POST'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(
+    content=Field(validate_content, "Mission content"),
+    category=Field(validate_text_input, "Category", max_length=150, min_length=1),
+)
 @rate_limit("10 per hour")
-def create_challenges():
-    data = request.get_json()
-
-    content = data.get('content', '')
-    validated_content, error = validate_content(content, "Mission content")
-    if error:
-        return jsonify({'error': error}), 400
-    
-    category = data.get('category', '')
-    validated_category, error = validate_text_input(category, "Category", max_length=150, min_length=1)
-    if error:
-        return jsonify({'error': error}), 400
-    
-
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    couple_id = user.couple_id
-
-    # Query the database to count missions created by this couple
-    existing_challenges_count = Challenges.query.filter_by(created_by=couple_id).count()
+def create_challenges(content, category):
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
 
-
-    # Check if the count is more than 5
-    if existing_challenges_count > 5:
-        return jsonify({'error': 'Forbidden - Maximum number of challenges created (5) exceeded'}), 403
+    # Counted on the couple row, the slot is given back if the insert fails
+    if not take_slot(couple_id, 'custom_challenges_count', MAX_CUSTOM_ITEMS):
+        return jsonify({'error': f'Forbidden - Maximum number of challenges created ({MAX_CUSTOM_ITEMS}) exceeded'}), 403
 
     new_challenges = Challenges(
-        content=validated_content,
-        category=validated_category,
+        content=content,
+        category=category,
         created_by=couple_id,
         is_precreated=False
     )
     db.session.add(new_challenges)
     db.session.commit()
+    bump_couple_version(couple_id, 'challenges', 'custom')
 
     return jsonify({
         'id': new_challenges.id,
@@ -672,57 +594,52 @@ def create_challenges():
 @api.route('/couples/<int:couple_id>/challenges', methods=['POST'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(challenges_id=Field(validate_id_int, "mission id"))
 @rate_limit("30 per minute")
-def accept_challenges(couple_id):
-    data = request.get_json()
-    challenges_id = data['challenges_id']
-    print("user liked challenge:", challenges_id)
-
-    challenges_id, error = validate_id_int(challenges_id, "mission id")
-    if error:
-        return jsonify({'error': error}), 400
-
-
-    # Verify user belongs to the couple
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.couple_id != couple_id:
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    print("setting new entry for couple:", couple_id, "challenge:", challenges_id)
+@couple_member_required
+def accept_challenges(couple_id, challenges_id):
+    try:
+        created = insert_if_absent(CoupleChallenges, ['couple_id', 'challenges_id'], couple_id=couple_id, challenges_id=challenges_id)
+        if created:
+            adjust_counters(couple_id, accepted_challenges_count=1)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error accepting challenge: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-    new_entry = CoupleChallenges(couple_id=couple_id, challenges_id=challenges_id)
-    db.session.add(new_entry)
-    db.session.commit()
+    if not created:
+        return jsonify({'message': 'challenges already accepted'}), 200
 
+    bump_couple_version(couple_id, 'challenges', 'accepted')
     return jsonify({'message': 'challenges accepted'}), 201
 
 
 @api.route('/scenarios', methods=['GET'])
 @jwt_required()
 @rate_limit("30 per minute")
+@conditional_catalog('scenarios')
 def get_scenarios():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        couple_id = user.couple_id
+        couple_id = current_couple_id()
+        if not couple_id:
+            return jsonify({'error': 'User not found'}), 404
+
+        # Scenarios have no category, only pagination applies
+        page, error = parse_page_args(allow_category=False)
+        if error:
+            return jsonify({'error': error}), 400
 
-        # Get all scenarios
-        scenarios = Scenario.query.all()
-        
         # Get accepted scenario IDs for this couple
-        accepted_ids = {cs.scenario_id for cs in CoupleScenario.query.filter_by(couple_id=couple_id)}
-
-        return jsonify([{
-            'id': s.id,
-            'setting': s.setting,
-            'roles': s.roles,
-            'prompt': s.prompt,
-            'time': s.time,
-            'is_precreated': s.is_precreated,
-            'accepted': s.id in accepted_ids  
-        } for s in scenarios]), 200
+        accepted_ids = {scenario_id for (scenario_id,) in db.session.query(CoupleScenario.scenario_id).filter_by(couple_id=couple_id)}
+
+        # Precreated scenarios come from the in-process cache,
+        # custom ones are the ones created by a member of this couple
+        member_ids = select(User.id).where(User.couple_id == couple_id)
+        custom = Scenario.query.filter(Scenario.created_by.in_(member_ids), Scenario.is_precreated == False)
+        result, next_after_id = list_catalog('scenarios', custom, page)
+
+        return catalog_response('scenarios', result, accepted_ids, next_after_id)
         
     except Exception as e:
         print(f"Error fetching scenarios: {str(e)}")
@@ -732,27 +649,24 @@ def get_scenarios():
 @api.route('/couples/<int:couple_id>/scenarios', methods=['POST'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(scenario_id=Field(validate_id_int, "mission id"))
 @rate_limit("30 per minute")
-def accept_scenario(couple_id):
-    data = request.get_json()
-    scenario_id = data['scenario_id']
-
-
-    scenario_id, error = validate_id_int(scenario_id, "mission id")
-    if error:
-        return jsonify({'error': error}), 400
-
-    # Verify user belongs to the couple
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.couple_id != couple_id:
-        return jsonify({'error': 'Unauthorized'}), 403
+@couple_member_required
+def accept_scenario(couple_id, scenario_id):
+    try:
+        created = insert_if_absent(CoupleScenario, ['couple_id', 'scenario_id'], couple_id=couple_id, scenario_id=scenario_id)
+        if created:
+            adjust_counters(couple_id, accepted_scenarios_count=1)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error accepting scenario: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-    new_entry = CoupleScenario(couple_id=couple_id, scenario_id=scenario_id)
-    db.session.add(new_entry)
-    db.session.commit()
+    if not created:
+        return jsonify({'message': 'scenario already accepted'}), 200
 
+    bump_couple_version(couple_id, 'scenarios', 'accepted')
     return jsonify({'message': 'scenario accepted'}), 201
 
 
@@ -761,9 +675,9 @@ def accept_scenario(couple_id):
 @validate_request_size(max_size_mb=3)
 @rate_limit("20 per minute")
 def delete_challenge(challenge_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    couple_id = user.couple_id
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
 
     challenge = Challenges.query.get(challenge_id)
     if not challenge:
@@ -773,8 +687,12 @@ def delete_challenge(challenge_id):
     if challenge.created_by != couple_id:
         return jsonify({'error': 'Unauthorized'}), 403
 
+    uncount_acceptances('challenges', CoupleChallenges.challenges_id == challenge_id)
+    adjust_counters(couple_id, custom_challenges_count=-1)
     db.session.delete(challenge)
+    record_tombstones('challenges', [challenge_id], couple_id)
     db.session.commit()
+    bump_couple_version(couple_id, 'challenges', 'custom')
     return jsonify({'message': 'Challenge deleted'}), 200
 
 
@@ -782,12 +700,8 @@ def delete_challenge(challenge_id):
 @jwt_required()
 @validate_request_size(max_size_mb=3)
 @rate_limit("30 per minute")
+@couple_member_required
 def unlike_challenge(couple_id, challenge_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.couple_id != couple_id:
-        return jsonify({'error': 'Unauthorized'}), 403
-
     entry = CoupleChallenges.query.filter_by(
         couple_id=couple_id, 
         challenges_id=challenge_id
@@ -797,7 +711,10 @@ def unlike_challenge(couple_id, challenge_id):
         return jsonify({'error': 'Entry not found'}), 404
 
     db.session.delete(entry)
+    adjust_counters(couple_id, accepted_challenges_count=-1)
+    record_tombstones('accepted_challenges', [challenge_id], couple_id)
     db.session.commit()
+    bump_couple_version(couple_id, 'challenges', 'accepted')
     return jsonify({'message': 'Challenge unliked'}), 200
 
 
@@ -805,12 +722,8 @@ def unlike_challenge(couple_id, challenge_id):
 @jwt_required()
 @validate_request_size(max_size_mb=3)
 @rate_limit("30 per minute")
+@couple_member_required
 def unlike_scenario(couple_id, scenario_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if user.couple_id != couple_id:
-        return jsonify({'error': 'Unauthorized'}), 403
-
     entry = CoupleScenario.query.filter_by(
         couple_id=couple_id, 
         scenario_id=scenario_id
@@ -820,10 +733,123 @@ def unlike_scenario(couple_id, scenario_id):
         return jsonify({'error': 'Entry not found'}), 404
 
     db.session.delete(entry)
+    adjust_counters(couple_id, accepted_scenarios_count=-1)
+    record_tombstones('accepted_scenarios', [scenario_id], couple_id)
     db.session.commit()
+    bump_couple_version(couple_id, 'scenarios', 'accepted')
     return jsonify({'message': 'Scenario unliked'}), 200
 
 
+# batch acceptance section
+
+def apply_acceptance_batch(kind, couple_id, accept_ids, unaccept_ids):
+    """
+    Accept and unaccept several items of a kind in one transaction.
+    Body: {"accept": [ids], "unaccept": [ids]}, answers with one result per id.
+    """
+    content_model, link_model, column_name = ACCEPTANCE_KINDS[kind]
+    column = getattr(link_model, column_name)
+
+    if set(accept_ids) & set(unaccept_ids):
+        return jsonify({'error': 'An id cannot be both accepted and unaccepted'}), 400
+
+    try:
+        existing_ids = set()
+        if accept_ids:
+            existing_ids = set(db.session.execute(
+                select(content_model.id).where(content_model.id.in_(accept_ids))
+            ).scalars())
+
+        # One multi-row upsert and one multi-row delete
+        accepted_ids = insert_many_if_absent(
+            link_model,
+            ['couple_id', column_name],
+            [{'couple_id': couple_id, column_name: id} for id in accept_ids if id in existing_ids],
+            column,
+        )
+        unaccepted_ids = set()
+        if unaccept_ids:
+            unaccepted_ids = set(db.session.execute(
+                delete(link_model)
+                .where(link_model.couple_id == couple_id, column.in_(unaccept_ids))
+                .returning(column)
+            ).scalars())
+            record_tombstones(f"accepted_{kind}", unaccepted_ids, couple_id)
+        adjust_counters(couple_id, **{f'accepted_{kind}_count': len(accepted_ids) - len(unaccepted_ids)})
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error applying {kind} batch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    if accepted_ids or unaccepted_ids:
+        bump_couple_version(couple_id, kind, 'accepted')
+
+    results = []
+    for id in accept_ids:
+        if id in accepted_ids:
+            status = 'accepted'
+        elif id in existing_ids:
+            status = 'already_accepted'
+        else:
+            status = 'not_found'
+        results.append({'id': id, 'action': 'accept', 'status': status})
+    for id in unaccept_ids:
+        status = 'unaccepted' if id in unaccepted_ids else 'not_accepted'
+        results.append({'id': id, 'action': 'unaccept', 'status': status})
+
+    return jsonify({'results': results}), 200
+
+
+@api.route('/couples/<int:couple_id>/missions/batch', methods=['POST'])
+@jwt_required()
+@validate_request_size(max_size_mb=3)
+@json_schema(accept=Field(validate_id_list, "accept"), unaccept=Field(validate_id_list, "unaccept"))
+@rate_limit("30 per minute")
+@couple_member_required
+def batch_missions(couple_id, accept, unaccept):
+    return apply_acceptance_batch('missions', couple_id, accept, unaccept)
+
+
+@api.route('/couples/<int:couple_id>/challenges/batch', methods=['POST'])
+@jwt_required()
+@validate_request_size(max_size_mb=3)
+@json_schema(accept=Field(validate_id_list, "accept"), unaccept=Field(validate_id_list, "unaccept"))
+@rate_limit("30 per minute")
+@couple_member_required
+def batch_challenges(couple_id, accept, unaccept):
+    return apply_acceptance_batch('challenges', couple_id, accept, unaccept)
+
+
+@api.route('/couples/<int:couple_id>/scenarios/batch', methods=['POST'])
+@jwt_required()
+@validate_request_size(max_size_mb=3)
+@json_schema(accept=Field(validate_id_list, "accept"), unaccept=Field(validate_id_list, "unaccept"))
+@rate_limit("30 per minute")
+@couple_member_required
+def batch_scenarios(couple_id, accept, unaccept):
+    return apply_acceptance_batch('scenarios', couple_id, accept, unaccept)
+
+
+# sync section
+
+@api.route('/sync', methods=['GET'])
+@jwt_required()
+@rate_limit("30 per minute")
+def sync_catalog():
+    """Delta sync: content and acceptances changed since ?cursor= (everything without one)"""
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
+
+    since, error = parse_cursor(request.args.get('cursor'))
+    if error:
+        return jsonify({'error': error}), 400
+
+    return jsonify(build_sync(couple_id, since)), 200
+
+
 # notebook routes
 
 @api.route('/story/start', methods=['POST'])
@@ -831,7 +857,9 @@ def unlike_scenario(couple_id, scenario_id):
 @validate_request_size(max_size_mb=3)
 @rate_limit("30 per minute")
 def start_story():
-    user = User.query.get(get_jwt_identity())
+    user = current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
     couple = user.couple
     
     if couple.story_started_at:
@@ -842,7 +870,7 @@ def start_story():
     db.session.commit()
     
     return jsonify({
-        'started_at': couple.story_started_at.isoformat(),
+        'started_at': couple.story_started_at,
         'current_page': couple.story_current_page,
         'completed_pages': []  # Add empty array
 
@@ -853,87 +881,139 @@ def start_story():
 @jwt_required()
 @rate_limit("30 per minute")
 def get_story_status():
-    user = User.query.get(get_jwt_identity())
-    couple = user.couple
-    
+    """
+    Story status of the couple, in one query.
+    ?summary=true: only the number of completed pages and the furthest completed one.
+    Otherwise the completed pages ordered by page number, optionally restricted to
+    ?from_page= / ?to_page= and keyset-paginated with ?after_page= and ?limit=
+    (next cursor in the X-Next-Cursor header).
+    """
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
+
+    if request.args.get('summary', '').lower() in ('1', 'true'):
+        return story_summary(couple_id)
+
+    args, error = parse_int_args(('from_page', 0), ('to_page', 0), ('after_page', 0), ('limit', 1))
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Range conditions go in the join so a couple without matching pages still gets its row
+    joined = [StoryProgress.couple_id == Couple.id]
+    if args['from_page'] is not None:
+        joined.append(StoryProgress.page_number >= args['from_page'])
+    if args['to_page'] is not None:
+        joined.append(StoryProgress.page_number <= args['to_page'])
+    if args['after_page'] is not None:
+        joined.append(StoryProgress.page_number > args['after_page'])
+    query = (
+        select(Couple.story_current_page, Couple.story_started_at, StoryProgress.page_number,
+               StoryProgress.completed_at, StoryProgress.fun_level, StoryProgress.comments)
+        .select_from(Couple)
+        .outerjoin(StoryProgress, and_(*joined))
+        .where(Couple.id == couple_id)
+        .order_by(StoryProgress.page_number)
+    )
+    limit = args['limit']
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        query = query.limit(limit + 1)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return jsonify({'error': 'Couple not found'}), 404
+
     completed_pages = [{
-        'page_number': p.page_number,
-        'completed_at': p.completed_at.isoformat(),
-        'fun_level': p.fun_level,
-        'comments': p.comments
-    } for p in couple.completed_pages]
-    
-    return jsonify({
-        'current_page': couple.story_current_page,
-        'started_at': couple.story_started_at.isoformat() if couple.story_started_at else None,
+        'page_number': row.page_number,
+        'completed_at': row.completed_at,
+        'fun_level': row.fun_level,
+        'comments': row.comments
+    } for row in rows if row.page_number is not None]
+
+    next_after_page = None
+    if limit is not None and len(completed_pages) > limit:
+        completed_pages = completed_pages[:limit]
+        next_after_page = completed_pages[-1]['page_number']
+
+    response = jsonify({
+        'current_page': rows[0].story_current_page,
+        'started_at': rows[0].story_started_at,
         'completed_pages': completed_pages
+    })
+    if next_after_page is not None:
+        response.headers['X-Next-Cursor'] = str(next_after_page)
+    return response, 200
+
+def story_summary(couple_id):
+    """Compact story status: counts and the furthest completed page, in one query"""
+    # Aliased so the subqueries correlate on the couple only, not on the joined page
+    pages = aliased(StoryProgress)
+    progress = select(pages).where(pages.couple_id == Couple.id)
+    furthest_id = (
+        progress.with_only_columns(pages.id)
+        .order_by(pages.page_number.desc(), pages.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    row = db.session.execute(
+        select(
+            Couple.story_current_page,
+            Couple.story_started_at,
+            progress.with_only_columns(func.count()).scalar_subquery().label('completed_count'),
+            progress.with_only_columns(func.max(pages.completed_at)).scalar_subquery().label('last_completed_at'),
+            StoryProgress.page_number,
+            StoryProgress.completed_at,
+            StoryProgress.fun_level,
+        )
+        .select_from(Couple)
+        .outerjoin(StoryProgress, StoryProgress.id == furthest_id)
+        .where(Couple.id == couple_id)
+    ).first()
+    if row is None:
+        return jsonify({'error': 'Couple not found'}), 404
+
+    latest_page = None
+    if row.page_number is not None:
+        latest_page = {
+            'page_number': row.page_number,
+            'completed_at': row.completed_at,
+            'fun_level': row.fun_level
+        }
+    return jsonify({
+        'current_page': row.story_current_page,
+        'started_at': row.story_started_at,
+        'completed_count': row.completed_count,
+        'last_completed_at': row.last_completed_at,
+        'latest_page': latest_page
     }), 200
 
 
 @api.route('/story/progress', methods=['POST'])
 @jwt_required()
 @validate_request_size(max_size_mb=3)
-@validate_json_structure()
+@json_schema(
+    page_number=Field(validate_id_int, "page number"),
+    fun_level=Field(validate_id_int, "fun level", optional=True),
+    comments=Field(validate_comments, optional=True),
+)
 @rate_limit("30 per minute")
-def update_progress():
-    user = User.query.get(get_jwt_identity())
-    couple = user.couple
-    data = request.get_json()
-
-    # Validate required fields
-
-    page_number = data.get('page_number')
-    page_number, error = validate_id_int(page_number, "page number")
-    if error:
+def update_progress(page_number, fun_level, comments):
+    couple_id = current_couple_id()
+    if not couple_id:
+        return jsonify({'error': 'User not found'}), 404
+
+    # One upsert on (couple_id, page_number), fields left out keep their value
+    completed_at = write_progress(couple_id, page_number, fun_level, comments)
+    if completed_at is None:
+        # New page without a fun level
+        db.session.rollback()
+        _, error = validate_id_int(fun_level, "fun level")
         return jsonify({'error' : error}), 400
 
-    # Find existing progress or create new
-    existing_progress = StoryProgress.query.filter_by(
-        couple_id=couple.id,
-        page_number=page_number
-    ).first()
-
-    if existing_progress:
-        # Update existing entry
-        fun_level = data.get('fun_level', existing_progress.fun_level)
-        fun_level, error = validate_id_int(fun_level, "fun level")
-        if error:
-            return jsonify({'error' : error}), 400
-        
-        comments =  data.get('comments', existing_progress.comments)
-        comments, error = validate_comments(comments)
-        if error:
-            return jsonify({'error' : error}), 400        
-        
-        existing_progress.fun_level = fun_level
-        existing_progress.comments = comments
-        existing_progress.completed_at = datetime.now()
-    else:
-        # Create new entry
-        fun_level = data.get('fun_level')
-        fun_level, error = validate_id_int(fun_level, "fun level")
-        if error:
-            return jsonify({'error' : error}), 400
-        
-        comments =  data.get('comments')
-        comments, error = validate_comments(comments)
-        if error:
-            return jsonify({'error' : error}), 400      
-        
-        new_progress = StoryProgress(
-            couple_id=couple.id,
-            page_number=page_number,
-            completed_at=datetime.now(),
-            fun_level=data.get('fun_level'),
-            comments=data.get('comments')
-        )
-        db.session.add(new_progress)
-
     db.session.commit()
 
     return jsonify({
-        'completed_at': existing_progress.completed_at.isoformat() if existing_progress 
-                        else new_progress.completed_at.isoformat()
+        'completed_at': completed_at
     }), 200
 
 
@@ -0,0 +1,147 @@
+"""
+Incremental seeding of the precreated content from the seed files.
+
+Each seed item is identified by the hash of its identifying field (content,
+or prompt for scenarios) and fingerprinted by the hash of all its fields.
+seed_manifest keeps one digest per seed file and seed_items one row per item:
+an unchanged seed file costs a single primary-key lookup, and a changed one
+only writes the items whose fingerprint changed.
+
+Rows seeded before the manifest existed are adopted by matching their
+identifying field, so upgrading never duplicates content.
+"""
+import hashlib
+import json
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, bindparam
+from models import db, Mission, Challenges, Scenario, SeedManifest, SeedItem
+from db_helpers import dialect_insert
+from catalog_cache import bump_catalog_version
+from seed_missions import precreated_missions
+from seed_challenges import precreated_challenges
+from seed_scenarios import precreated_scenarios
+
+# kind -> (model, seed items, identifying field, seeded fields)
+SEED_FILES = {
+    'missions': (Mission, precreated_missions, 'content', ('content', 'category')),
+    'challenges': (Challenges, precreated_challenges, 'content', ('content', 'category')),
+    'scenarios': (Scenario, precreated_scenarios, 'prompt', ('setting', 'roles', 'prompt', 'time')),
+}
+
+
+def _hash(value):
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def seed_item(kind, item):
+    """Seed file entry -> (item key, seeded values, item hash)"""
+    key_field, fields = SEED_FILES[kind][2:]
+    values = {field: item.get(field) for field in fields}
+    return _hash(values[key_field]), values, _hash(values)
+
+
+def merge_items(kind, items):
+    """
+    Insert the new seed items of a kind and rewrite the changed ones, in the
+    current transaction. Returns (added, updated).
+    """
+    model, _, key_field, _ = SEED_FILES[kind]
+
+    # item key -> (values, item hash)
+    seeds = {}
+    for item in items:
+        key, values, item_hash = seed_item(kind, item)
+        seeds[key] = (values, item_hash)
+    if not seeds:
+        return 0, 0
+
+    known = {
+        key: (item_hash, entity_id)
+        for key, item_hash, entity_id in db.session.execute(
+            select(SeedItem.item_key, SeedItem.item_hash, SeedItem.entity_id).where(
+                SeedItem.kind == kind,
+                SeedItem.item_key.in_(list(seeds))
+            )
+        )
+    }
+    entity_ids = {key: entity_id for key, (_, entity_id) in known.items()}
+    changed = [key for key, (item_hash, _) in known.items() if seeds[key][1] != item_hash]
+
+    # Items missing from the manifest: adopt matching rows seeded earlier, insert the rest
+    key_column = getattr(model, key_field)
+    missing = [key for key in seeds if key not in known]
+    if missing:
+        adopted = {
+            _hash(value): id
+            for id, value in db.session.execute(
+                select(model.id, key_column).where(
+                    model.is_precreated == True,
+                    key_column.in_([seeds[key][0][key_field] for key in missing])
+                )
+            )
+        }
+        entity_ids.update(adopted)
+        # Adopted rows may predate a seed edit, rewrite them once
+        changed += list(adopted)
+    new = [key for key in missing if key not in entity_ids]
+
+    if new:
+        now = datetime.utcnow()
+        inserted = db.session.execute(
+            insert(model)
+            .values([{**seeds[key][0], 'is_precreated': True, 'created_at': now} for key in new])
+            .returning(model.id, key_column)
+        )
+        entity_ids.update({_hash(value): id for id, value in inserted})
+
+    if changed:
+        table = model.__table__
+        now = datetime.now()
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('_id')),
+            [{**seeds[key][0], '_id': entity_ids[key], 'updated_at': now} for key in changed]
+        )
+
+    if new or changed:
+        stmt = dialect_insert(SeedItem).values([
+            {'kind': kind, 'item_key': key, 'item_hash': seeds[key][1], 'entity_id': entity_ids[key]}
+            for key in new + changed
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['kind', 'item_key'],
+            set_={'item_hash': stmt.excluded.item_hash, 'entity_id': stmt.excluded.entity_id}
+        ))
+
+    return len(new), len(changed)
+
+
+def seed_kind(kind, force=False):
+    """
+    Bring the precreated rows of a kind in line with its seed file and commit.
+    Returns (added, updated), or None when the seed file did not change
+    (force re-checks every item anyway).
+    """
+    items = SEED_FILES[kind][1]
+    digest = _hash(items)
+    manifest = db.session.get(SeedManifest, kind)
+    if manifest is not None and manifest.digest == digest and not force:
+        return None
+
+    added, updated = merge_items(kind, items)
+
+    if manifest is None:
+        manifest = SeedManifest(name=kind)
+        db.session.add(manifest)
+    manifest.digest = digest
+    db.session.commit()
+
+    if added or updated:
+        bump_catalog_version()
+    return added, updated
+
+
+def forget_seed(kind):
+    """Drop the manifest of a kind (its precreated rows were deleted), in the current transaction"""
+    db.session.execute(delete(SeedItem).where(SeedItem.kind == kind))
+    db.session.execute(delete(SeedManifest).where(SeedManifest.name == kind))
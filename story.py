@@ -0,0 +1,60 @@
+"""
+Story progress writes.
+
+A completed page is written with one INSERT ... ON CONFLICT DO UPDATE on
+(couple_id, page_number), so repeated or concurrent submissions of a page
+update the same row. The couple's current page moves past the completed page
+in the same statement on Postgres (data-modifying CTEs), so a submission is a
+single round trip; other databases (SQLite) run the two writes in turn.
+"""
+from datetime import datetime
+from sqlalchemy import select, update, exists, case, func
+from models import db, Couple, StoryProgress
+from db_helpers import dialect_insert
+
+
+def write_progress(couple_id, page_number, fun_level, comments):
+    """
+    Record a completed page, in the current transaction. Fields passed as None keep
+    their stored value; a new page needs a fun_level. Returns the completed_at
+    written, or None when the page is new and fun_level is missing.
+    """
+    now = datetime.now()
+    if fun_level is None:
+        # Only an existing page can be completed again without a fun level
+        write = (
+            update(StoryProgress)
+            .where(StoryProgress.couple_id == couple_id, StoryProgress.page_number == page_number)
+            .values(completed_at=now, comments=func.coalesce(comments, StoryProgress.comments))
+        )
+    else:
+        write = dialect_insert(StoryProgress).values(
+            couple_id=couple_id, page_number=page_number, completed_at=now,
+            fun_level=fun_level, comments=comments
+        )
+        write = write.on_conflict_do_update(
+            index_elements=['couple_id', 'page_number'],
+            set_={
+                'completed_at': write.excluded.completed_at,
+                'fun_level': write.excluded.fun_level,
+                'comments': func.coalesce(write.excluded.comments, StoryProgress.comments),
+            }
+        )
+    write = write.returning(StoryProgress.completed_at)
+
+    # The reader moves on to the next page, never back
+    next_page = page_number + 1
+    current_page = func.coalesce(Couple.story_current_page, 0)
+    advance = update(Couple).values(
+        story_current_page=case((current_page < next_page, next_page), else_=current_page)
+    )
+
+    if db.engine.dialect.name == 'postgresql':
+        written = write.cte('written')
+        advanced = advance.where(Couple.id == couple_id, exists(select(written.c.completed_at))).cte('advanced')
+        return db.session.execute(select(written.c.completed_at).add_cte(advanced)).scalar()
+
+    completed_at = db.session.execute(write).scalar()
+    if completed_at is not None:
+        db.session.execute(advance.where(Couple.id == couple_id))
+    return completed_at
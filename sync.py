@@ -0,0 +1,122 @@
+"""
+Incremental (delta) sync of the catalog and of a couple's acceptances.
+
+Changes are tracked with the updated_at column of the content tables, the
+accepted_at column of the acceptance tables and the SyncTombstone rows
+written by every path that deletes content or acceptances.
+
+A client sends back the cursor it got from its previous sync and receives
+only what changed since then. Without a cursor, or with one older than the
+tombstone retention, it gets a full snapshot ("full": true) and should
+replace its local state.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, or_
+from models import db, User, Mission, Challenges, Scenario, CoupleMission, CoupleChallenges, CoupleScenario, SyncTombstone
+from catalog_cache import CATALOG_KINDS, get_precreated
+
+# kind -> (content model, acceptance model, acceptance column)
+ACCEPTANCE_KINDS = {
+    'missions': (Mission, CoupleMission, 'mission_id'),
+    'challenges': (Challenges, CoupleChallenges, 'challenges_id'),
+    'scenarios': (Scenario, CoupleScenario, 'scenario_id'),
+}
+
+TOMBSTONE_RETENTION = timedelta(days=30)
+# The next cursor is moved back a bit so rows committed by slower, concurrent
+# transactions are not skipped. Clients may see a few items twice.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def record_tombstones(kind, entity_ids, couple_id=None):
+    """
+    Remember deleted rows in the current transaction (one multi-row insert).
+    kind is a content kind ('missions', ...) or 'accepted_<kind>' for acceptances,
+    couple_id is None for precreated content.
+    """
+    if not entity_ids:
+        return
+    db.session.execute(
+        insert(SyncTombstone),
+        [{'kind': kind, 'entity_id': entity_id, 'couple_id': couple_id, 'deleted_at': datetime.now()} for entity_id in entity_ids]
+    )
+
+
+def prune_tombstones():
+    """Delete tombstones older than the retention, returns how many were removed"""
+    removed = SyncTombstone.query.filter(SyncTombstone.deleted_at < datetime.now() - TOMBSTONE_RETENTION).delete()
+    db.session.commit()
+    return removed
+
+
+def parse_cursor(cursor):
+    """Cursor string -> datetime (None when absent)"""
+    if not cursor:
+        return None, None
+    try:
+        since = datetime.fromisoformat(cursor)
+    except (TypeError, ValueError):
+        return None, "Invalid cursor"
+    # Cursors with an offset are compared in the server's naive local time, like every stored timestamp
+    if since.tzinfo is not None:
+        since = since.astimezone().replace(tzinfo=None)
+    return since, None
+
+
+def _owned_by(model, couple_id):
+    # Scenarios are created by users, missions and challenges by couples
+    if model is Scenario:
+        return model.created_by.in_(select(User.id).where(User.couple_id == couple_id))
+    return model.created_by == couple_id
+
+
+def _deleted_since(kind, couple_id, since):
+    # A row can be deleted, re-created and deleted again: dedup the ids
+    return list(dict.fromkeys(db.session.execute(
+        select(SyncTombstone.entity_id).where(
+            SyncTombstone.kind == kind,
+            or_(SyncTombstone.couple_id == couple_id, SyncTombstone.couple_id.is_(None)),
+            SyncTombstone.deleted_at > since,
+        )
+    ).scalars()))
+
+
+def build_sync(couple_id, since):
+    """Changes visible to a couple since a cursor datetime (everything when since is None)"""
+    now = datetime.now()
+    full = since is None or since < now - TOMBSTONE_RETENTION
+    payload = {'full': full}
+
+    for kind, (model, link_model, column_name) in ACCEPTANCE_KINDS.items():
+        serializer = CATALOG_KINDS[kind][1]
+        link_column = getattr(link_model, column_name)
+        owned = _owned_by(model, couple_id)
+        accepted_query = select(link_column).where(link_model.couple_id == couple_id)
+
+        if full:
+            custom = model.query.filter(owned, model.is_precreated == False).order_by(model.id).all()
+            upserted = list(get_precreated(kind)) + [serializer(row) for row in custom]
+            deleted = []
+            accepted = list(db.session.execute(accepted_query).scalars())
+            unaccepted = []
+        else:
+            rows = model.query.filter(
+                or_(model.is_precreated == True, owned),
+                model.updated_at > since
+            ).order_by(model.id).all()
+            upserted = [serializer(row) for row in rows]
+            deleted = _deleted_since(kind, couple_id, since)
+            accepted = list(db.session.execute(accepted_query.where(link_model.accepted_at > since)).scalars())
+            # Unaccepted then accepted again within the window: the current state wins
+            still_accepted = set(accepted)
+            unaccepted = [id for id in _deleted_since(f"accepted_{kind}", couple_id, since) if id not in still_accepted]
+
+        payload[kind] = {
+            'upserted': upserted,
+            'deleted': deleted,
+            'accepted': accepted,
+            'unaccepted': unaccepted,
+        }
+
+    payload['cursor'] = (now - SYNC_OVERLAP).isoformat()
+    return payload
@@ -0,0 +1,59 @@
+"""
+JWT helpers.
+
+Access tokens carry the user's couple_id as an extra claim so the couple
+routes can authorize without loading the user. The claim goes stale when the
+user's couple changes or the account is deleted, so those paths must call
+revoke_user_tokens(): every access token issued before that moment is then
+rejected and the client has to go through /refresh, which re-reads the
+couple from the database.
+"""
+import logging
+import time
+import redis
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+logger = logging.getLogger(__name__)
+
+
+def _revoked_key(user_id):
+    return f"jwt:revoked_before:{user_id}"
+
+
+def create_user_access_token(user_id, couple_id):
+    """Access token with the couple_id claim"""
+    return create_access_token(identity=str(user_id), additional_claims={'couple_id': couple_id})
+
+
+def create_user_tokens(user_id, couple_id):
+    """(access_token, refresh_token) pair for a user"""
+    return create_user_access_token(user_id, couple_id), create_refresh_token(identity=str(user_id))
+
+
+def revoke_user_tokens(user_id):
+    """Reject every access token of the user issued until now"""
+    redis_client = current_app.extensions.get('redis')
+    if redis_client is None:
+        logger.warning(f"No Redis, access tokens of user {user_id} stay valid until they expire")
+        return
+    ttl = int(current_app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
+    try:
+        redis_client.set(_revoked_key(user_id), int(time.time()), ex=ttl)
+    except redis.RedisError as e:
+        logger.warning(f"Could not revoke tokens of user {user_id}: {e}")
+
+
+def is_token_revoked(jwt_payload):
+    """Blocklist check for flask_jwt_extended (only access tokens carry claims that can go stale)"""
+    if jwt_payload.get('type') != 'access':
+        return False
+    redis_client = current_app.extensions.get('redis')
+    if redis_client is None:
+        return False
+    try:
+        revoked_before = redis_client.get(_revoked_key(jwt_payload['sub']))
+    except redis.RedisError as e:
+        logger.warning(f"Could not check token revocation: {e}")
+        return False
+    return revoked_before is not None and jwt_payload['iat'] <= int(revoked_before)
@@ -0,0 +1,198 @@
+"""
+Input validation for the API.
+
+The unsafe-content patterns are compiled once, into a single alternation, so
+a text is scanned in one pass. Cheaper checks run first: length, then a
+character test that skips the regex entirely for plain text.
+
+Routes declare their JSON body with json_schema(): the schema is compiled
+once, the body is parsed once, and the handler receives the validated
+values as keyword arguments.
+"""
+import re
+from functools import wraps
+from flask import request, jsonify
+from werkzeug.exceptions import BadRequest
+
+# Script tags, javascript: protocol, event handlers, iframes, objects, embeds,
+# eval() calls, Function constructor (all matched case-insensitively)
+UNSAFE_PATTERNS = (
+    r'<script[^>]*>.*?</script>'
+    r'|javascript:'
+    r'|on\w+\s*='
+    r'|<iframe[^>]*>'
+    r'|<object[^>]*>'
+    r'|<embed[^>]*>'
+    r'|eval\s*\('
+    r'|function\s*\('
+)
+UNSAFE_PATTERN = re.compile(UNSAFE_PATTERNS, re.IGNORECASE)
+# IGNORECASE is most of the matching cost: on ASCII text, searching the lowercased
+# text with a case-sensitive pattern gives the same result several times faster
+UNSAFE_PATTERN_LOWER = re.compile(UNSAFE_PATTERNS)
+SPECIAL_CHARS = '<>{}[]\\`'
+SPECIAL_PATTERN = re.compile(r'[<>{}[\]\\`]')
+NAME_PATTERN = re.compile(r"^[a-zA-Z\s\-'\.]+$")
+
+
+def contains_unsafe_content(text):
+    """True when the text matches one of the unsafe patterns"""
+    # Every unsafe pattern contains one of these characters
+    if not ('<' in text or ':' in text or '=' in text or '(' in text):
+        return False
+    if text.isascii():
+        return UNSAFE_PATTERN_LOWER.search(text.lower()) is not None
+    return UNSAFE_PATTERN.search(text) is not None
+
+
+def validate_text_input(text, field_name, max_length=500, min_length=1):
+    """
+    Validate and sanitize text input to prevent injection attacks
+    """
+    if text is None or not isinstance(text, str):
+        return None, f"{field_name} is required and must be text"
+
+    # Strip whitespace
+    text = text.strip()
+
+    # Check length
+    if len(text) < min_length:
+        return None, f"{field_name} is too short"
+    if len(text) > max_length:
+        return None, f"{field_name} is too long (max {max_length} characters)"
+
+    # Check for potentially dangerous patterns
+    if contains_unsafe_content(text):
+        return None, f"{field_name} contains potentially unsafe content"
+
+    # Additional check for excessive special characters (counted only when there are some)
+    special_char_count = sum(map(text.count, SPECIAL_CHARS)) if SPECIAL_PATTERN.search(text) else 0
+    if special_char_count > len(text) * 0.1:  # More than 10% special chars
+        return None, f"{field_name} contains too many special characters"
+
+    return text, None
+
+def validate_name(name):
+    """Specific validation for names"""
+    name, error = validate_text_input(name, "Name", max_length=30, min_length=1)
+    if error:
+        return None, error
+
+    # Names should be mostly letters, spaces, hyphens, apostrophes
+    if not NAME_PATTERN.match(name):
+        return None, "Name contains invalid characters"
+
+    return name, None
+
+def validate_content(content, content_type="Content"):
+    """Validate mission/challenge content"""
+    return validate_text_input(content, content_type, max_length=300, min_length=5)
+
+def validate_comments(comments):
+    """Validate user comments"""
+    if not comments:  # Comments are optional
+        return "", None
+    return validate_text_input(comments, "Comments", max_length=300, min_length=1)
+
+def validate_id_int(id, field_name):
+    """validate the id, when supposed to be a single integer"""
+    if id is None or not isinstance(id, int):
+        return None, f"{field_name} is required and must be integer"
+    if len(str(id)) > 5:
+        return None, f"{field_name} is too long"
+
+    return id, None
+
+def validate_id_list(ids, field_name, max_items=200):
+    """validate a list of integer ids, duplicates are dropped (order kept)"""
+    if ids is None:
+        return [], None
+    if not isinstance(ids, list):
+        return None, f"{field_name} must be a list of integers"
+    if len(ids) > max_items:
+        return None, f"{field_name} has too many items (max {max_items})"
+    for id in ids:
+        id, error = validate_id_int(id, field_name)
+        if error:
+            return None, error
+    return list(dict.fromkeys(ids)), None
+
+def validate_flag(value, field_name):
+    """a yes/no field, read by its truthiness ("true", 1 and true all count as yes)"""
+    return bool(value), None
+
+def validate_string(value, field_name):
+    """any JSON string, for fields the handler checks itself"""
+    if not isinstance(value, str):
+        return None, f"{field_name} must be text"
+    return value, None
+
+def validate_token(token):
+    """validate an opaque token string (Google ID token)"""
+    if not token or not isinstance(token, str):
+        return None, "Token is required"
+    if len(token) > 4096:
+        return None, "Token is too long"
+    return token, None
+
+def validate_invitation_code(code):
+    """validate an optional invitation code, an empty one counts as absent"""
+    if not isinstance(code, str):
+        return None, "Invalid invitation code"
+    code = code.strip()
+    if code and not 10 <= len(code) <= 40:
+        return None, "Invalid invitation code"
+    return code or None, None
+
+def validate_couple_name(couple_name):
+    """validate an optional couple name, an empty one counts as absent"""
+    if not couple_name:
+        return None, None
+    couple_name, error = validate_name(couple_name)
+    if error:
+        return None, f"Couple {error.lower()}"
+    return couple_name, None
+
+
+class Field:
+    """
+    One field of a JSON body schema: validator(value, *args, **kwargs) -> (value, error).
+    A missing or null optional field is passed to the handler as None without validation.
+    """
+
+    def __init__(self, validator, *args, optional=False, **kwargs):
+        self.validate = (lambda value: validator(value, *args, **kwargs)) if args or kwargs else validator
+        self.optional = optional
+
+
+def json_schema(**schema):
+    """
+    Parse the JSON object body once, validate it against the schema and pass the
+    validated fields to the route as keyword arguments. Errors answer 400.
+    """
+    fields = tuple((name, field.validate, field.optional) for name, field in schema.items())
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not request.is_json:
+                return jsonify({'error': 'Content-Type must be application/json'}), 400
+            try:
+                data = request.get_json()
+            except BadRequest:
+                return jsonify({'error': 'Malformed JSON'}), 400
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Invalid JSON'}), 400
+
+            for name, validate, optional in fields:
+                value = data.get(name)
+                if value is None and optional:
+                    kwargs[name] = None
+                    continue
+                value, error = validate(value)
+                if error:
+                    return jsonify({'error': error}), 400
+                kwargs[name] = value
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator